@@ -12,6 +12,8 @@ Commands:
   /exit     - quit
   /help     - show help
   /reload   - reload knowledge.json
+Server: python AI.py --serve 8765   (load test with ai_loadgen.py)
+KNOWLEDGE_FILE may be a directory of *.json shards (later file names take precedence).
 """
 import json
 import os
@@ -20,16 +22,58 @@ import math
 import datetime
 import ast
 import operator as op
+import re
+import heapq
+import random
+import functools
+import itertools
+import array
+import mmap
+import struct
+import bisect
+import zlib
+import sys
+import multiprocessing
+import select
+import threading
+import asyncio
+from collections import deque, Counter, OrderedDict
+from collections.abc import MutableMapping
+from contextlib import nullcontext, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # optional: eval_columns falls back to array.array
+    np = None
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 KNOWLEDGE_FILE = "knowledge.json"
 
 # Safe eval for arithmetic expressions
+MAX_EXPR_LEN = 1000      # characters
+MAX_EXPR_NODES = 200     # AST nodes
+MAX_POW_BITS = 10000     # approximate size limit for integer powers
+
+def _safe_pow(base, exp):
+    """Power that refuses integer results too large to compute quickly (e.g. 9**9**9)."""
+    if isinstance(base, int) and isinstance(exp, int) and exp > 0 and abs(base) > 1:
+        if exp * math.log2(abs(base)) > MAX_POW_BITS:
+            raise ValueError("exponent too large")
+    return op.pow(base, exp)
+
 _ALLOWED_OPERATORS = {
     ast.Add: op.add,
     ast.Sub: op.sub,
     ast.Mult: op.mul,
     ast.Div: op.truediv,
-    ast.Pow: op.pow,
+    ast.Pow: _safe_pow,
     ast.USub: op.neg,
     ast.Mod: op.mod,
     ast.FloorDiv: op.floordiv,
@@ -39,43 +83,1231 @@ def safe_eval(expr: str):
     """
     Evaluate a simple arithmetic expression safely.
     Supports + - * / ** % // and parentheses.
+    Expressions are compiled once and cached, so repeats skip parsing.
     """
     try:
-        node = ast.parse(expr, mode="eval").body
-        return _eval_node(node)
+        fn, names = compile_expr(expr)
+        if names:
+            raise ValueError("variables are not allowed")
+        return fn(None)
     except Exception as e:
         raise ValueError("invalid expression") from e
 
-def _eval_node(node):
-    if isinstance(node, ast.Num):  # <number>
-        return node.n
-    if isinstance(node, ast.BinOp):
-        left = _eval_node(node.left)
-        right = _eval_node(node.right)
-        op_type = type(node.op)
-        if op_type in _ALLOWED_OPERATORS:
-            return _ALLOWED_OPERATORS[op_type](left, right)
-    if isinstance(node, ast.UnaryOp):
-        operand = _eval_node(node.operand)
-        op_type = type(node.op)
-        if op_type in _ALLOWED_OPERATORS:
-            return _ALLOWED_OPERATORS[op_type](operand)
+# eval_columns arithmetic: IEEE float64 results (inf/nan) where Python floats raise,
+# matching NumPy. On arrays the operations never raise, so these work for both backends.
+def _odd(x):
+    return x.is_integer() and x % 2 == 1
+
+def _float_div(a, b):
+    try:
+        return a / b
+    except ZeroDivisionError:
+        return math.nan if a == 0 or a != a else math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+def _float_floordiv(a, b):
+    try:
+        return a // b
+    except ZeroDivisionError:
+        return _float_div(a, b)
+
+def _float_mod(a, b):
+    try:
+        return a % b
+    except ZeroDivisionError:
+        return math.nan
+
+def _float_pow(a, b):
+    try:
+        value = a ** b
+    except ZeroDivisionError:  # 0.0 ** negative
+        return math.copysign(math.inf, a) if _odd(b) else math.inf
+    except OverflowError:
+        if a > 0 or b.is_integer():
+            return -math.inf if a < 0 and _odd(b) else math.inf
+        return math.nan
+    return math.nan if isinstance(value, complex) else value
+
+_COLUMN_OPERATORS = {**_ALLOWED_OPERATORS, ast.Div: _float_div, ast.FloorDiv: _float_floordiv,
+                     ast.Mod: _float_mod, ast.Pow: _float_pow}
+
+@functools.lru_cache(maxsize=4096)
+def compile_expr(expr: str, columns: bool = False):
+    """
+    Parse expr and compile it into a closure taking a variable environment (a mapping).
+    Returns (fn, names) where names is the set of variables the expression uses.
+    columns=True compiles for eval_columns: float constants, and inf/nan instead of
+    exceptions. Raises ValueError for oversized or unsupported expressions.
+    """
+    if len(expr) > MAX_EXPR_LEN:
+        raise ValueError("expression too long")
+    tree = ast.parse(expr, mode="eval")
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_EXPR_NODES:
+        raise ValueError("expression too complex")
+    names = frozenset(n.id for n in nodes if isinstance(n, ast.Name))
+    if columns:
+        return _compile_node(tree.body, _COLUMN_OPERATORS, float), names
+    return _compile_node(tree.body), names
+
+def _compile_node(node, operators=_ALLOWED_OPERATORS, number=None):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):  # <number>
+        value = number(node.value) if number else node.value
+        return lambda env: value
+    if isinstance(node, ast.Name):  # <variable>
+        name = node.id
+        return lambda env: env[name]
+    if isinstance(node, ast.BinOp) and type(node.op) in operators:
+        fn = operators[type(node.op)]
+        left = _compile_node(node.left, operators, number)
+        right = _compile_node(node.right, operators, number)
+        return lambda env: fn(left(env), right(env))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in operators:
+        fn = operators[type(node.op)]
+        operand = _compile_node(node.operand, operators, number)
+        return lambda env: fn(operand(env))
     raise ValueError("unsupported expression")
 
-# Load simple Q/A knowledge file if present
-def load_knowledge(path=KNOWLEDGE_FILE):
-    if os.path.exists(path):
+def eval_columns(expr: str, columns: dict):
+    """
+    Evaluate one arithmetic expression element-wise over columns of data.
+    columns maps variable names to equal-length sequences (lists, array.array or
+    NumPy arrays) or scalars. Values are evaluated as float64, with NumPy when
+    installed, otherwise by a compiled per-row loop producing array.array('d').
+    Rows never raise and both backends agree: overflow yields inf, division by zero
+    inf (or nan for 0/0), and invalid results such as a fractional power of a
+    negative number nan.
+    """
+    try:
+        fn, names = compile_expr(expr, columns=True)
+    except Exception as e:
+        raise ValueError("invalid expression") from e
+    missing = names - columns.keys()
+    if missing:
+        raise ValueError(f"unknown variable(s): {', '.join(sorted(missing))}")
+    if np is not None:
+        # float64 up front: int64 columns would wrap on overflow and reject negative powers
+        env = {name: np.asarray(columns[name], dtype=np.float64) for name in names}
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return np.asarray(fn(env), dtype=float)
+    series = {}
+    scalars = {}
+    for name in names:
+        col = columns[name]
+        if isinstance(col, (int, float)):
+            scalars[name] = float(col)
+        else:
+            series[name] = col if isinstance(col, array.array) and col.typecode == "d" else array.array("d", col)
+    lengths = {len(col) for col in series.values()}
+    if len(lengths) > 1:
+        raise ValueError("columns must have the same length")
+    if not series:
+        return array.array("d", [fn(scalars)])
+    env = dict(scalars)
+    keys = list(series)
+    out = array.array("d")
+    append = out.append
+    for row in zip(*series.values()):
+        env.update(zip(keys, row))
+        append(fn(env))
+    return out
+
+# Knowledge persistence: a JSON snapshot (knowledge.json) plus an append-only
+# journal of additions (knowledge.journal.jsonl). Writers append under an exclusive
+# file lock; once the journal grows past JOURNAL_COMPACT_BYTES it is folded into
+# a new snapshot written to a temp file and atomically renamed into place.
+JOURNAL_FSYNC = True
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+
+def journal_path(path=KNOWLEDGE_FILE):
+    return os.path.splitext(path)[0] + ".journal.jsonl"
+
+@contextmanager
+def _file_lock(path, shared=False):
+    """
+    Hold an advisory lock on '<path>.lock' so several processes can share the files.
+    A shared (reader) lock that cannot create the lock file, e.g. in a read-only or
+    missing directory, reads unlocked instead of failing.
+    """
+    try:
+        lf = open(path + ".lock", "a+b")
+    except OSError:
+        if not shared:
+            raise
+        yield
+        return
+    with lf:
+        if fcntl is not None:
+            fcntl.flock(lf, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lf.seek(0)
+            msvcrt.locking(lf.fileno(), msvcrt.LK_LOCK, 1)
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lf.seek(0)
+                msvcrt.locking(lf.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Sharded knowledge: KNOWLEDGE_FILE may also be a directory of *.json shards. Shards
+# are applied in sorted file-name order (later names win), then the compacted journal
+# shard, then the journal. Shards are parsed in parallel worker processes, and files
+# above STREAM_THRESHOLD bytes are parsed incrementally so their text is never held whole.
+SHARD_JOURNAL = "_journal.json"
+STREAM_THRESHOLD = 64 * 1024 * 1024
+_WS_RE = re.compile(r"[ \t\n\r]*")
+
+def iter_json_object(f, chunk_size=1 << 20):
+    """
+    Yield the (key, value) pairs of a top-level JSON object from a text file, reading
+    chunk_size characters at a time. Memory stays around one chunk plus one value.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            pos = _WS_RE.match(buf, pos).end()
+            if pos < len(buf) or not fill():
+                return
+
+    def expect(chars):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError(f"expected one of {chars!r} in JSON object")
+        pos += 1
+        return buf[pos - 1]
+
+    def value():
+        nonlocal pos
+        skip_ws()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # a number cut at the buffer edge ("12|3", "1.|5", "2e|+7") may continue
+                # in the next chunk; at most two unparsed characters can be part of it
+                if end < len(buf) - 2 or eof:
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    expect("{")
+    skip_ws()
+    if pos < len(buf) and buf[pos] == "}":
+        return
+    while True:
+        key = value()
+        if not isinstance(key, str):
+            raise ValueError("JSON object keys must be strings")
+        expect(":")
+        yield key, value()
+        if expect(",}") == "}":
+            return
+
+def _merge_json_file(path, into: dict):
+    """Merge the JSON object in path into a dict; large files are streamed."""
+    with open(path, "r", encoding="utf-8") as f:
+        if os.path.getsize(path) > STREAM_THRESHOLD:
+            into.update(iter_json_object(f))
+        else:
+            data = json.load(f)
             if isinstance(data, dict):
-                return {k.lower(): v for k, v in data.items()}
+                into.update(data)
+    return into
+
+def shard_files(path):
+    """Shard files of a knowledge directory in precedence order (lowest first)."""
+    names = sorted(n for n in os.listdir(path) if n.endswith(".json") and n != SHARD_JOURNAL)
+    files = [os.path.join(path, n) for n in names]
+    if os.path.exists(os.path.join(path, SHARD_JOURNAL)):
+        files.append(os.path.join(path, SHARD_JOURNAL))
+    return files
+
+def _source_files(path):
+    if os.path.isdir(path):
+        return shard_files(path)
+    return [path] if os.path.exists(path) else []
+
+def _source_signature(path):
+    """[name, size, mtime_ns] of every snapshot file, so added, removed or replaced shards show."""
+    sig = []
+    for p in _source_files(path):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        sig.append([os.path.basename(p), st.st_size, st.st_mtime_ns])
+    return sig
+
+def _load_shard(path):
+    try:
+        return _merge_json_file(path, {})
+    except (OSError, ValueError):
+        return {}
+
+def load_shards(path, workers=None):
+    """
+    Parse every shard of a knowledge directory and merge by precedence. Shards are
+    parsed in parallel forked worker processes while this is the process's only thread.
+    """
+    files = shard_files(path)
+    if workers is None:
+        # a worker process parses serially by default (spawned children re-import this module)
+        in_worker = multiprocessing.parent_process() is not None
+        workers = 1 if in_worker else min(len(files), os.cpu_count() or 1)
+    merged = {}
+    # only fork workers, and only while single-threaded (watcher, warm-up and server threads
+    # could deadlock a forked child). Under spawn or forkserver every child re-imports this
+    # module and so loads the whole KB itself, which is slower than parsing here.
+    if (workers <= 1 or len(files) <= 1 or threading.active_count() > 1
+            or multiprocessing.get_context().get_start_method() != "fork"):
+        for shard in files:
+            try:
+                _merge_json_file(shard, merged)
+            except (OSError, ValueError):
+                pass
+        return merged
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields in submission order, so precedence holds while shards parse concurrently
+        for data in pool.map(_load_shard, files):
+            merged.update(data)
+            del data
+    return merged
+
+def _read_snapshot(path):
+    if os.path.isdir(path):
+        return load_shards(path)
+    if os.path.exists(path):
+        try:
+            return _merge_json_file(path, {})
         except Exception:
             pass
     return {}
 
+def _journal_record(line):
+    """(question, answer) from one journal line, or None for a torn or foreign line."""
+    try:
+        rec = json.loads(line)
+        q, a = rec["q"], rec["a"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return (q, a) if isinstance(q, str) else None
+
+def _replay_journal(path, data):
+    jpath = journal_path(path)
+    if not os.path.exists(jpath):
+        return data
+    with open(jpath, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = _journal_record(line)
+            if rec is not None:  # skip a torn write from a crash; later lines are still valid
+                data[rec[0]] = rec[1]
+    return data
+
+def _read_all(path):
+    return _replay_journal(path, _read_snapshot(path))
+
+# Compact read-only store (knowledge.kbx) opened with mmap: a sorted offset table
+# lets lookups binary-search keys in place, and answers are only decoded on access.
+# Layout (native byte order):
+#   b"KBX1" | u32 count | u32 n | (2*count + 1) x u64 offsets | records | signature
+# record i is key bytes at offsets[2i]:offsets[2i+1], JSON answer up to offsets[2i+2];
+# the last n bytes are the JSON _source_signature of the snapshot the store was built from.
+_KBX_MAGIC = b"KBX1"
+_KBX_HEADER = struct.Struct("=4sII")
+
+def store_path(path=KNOWLEDGE_FILE):
+    return os.path.splitext(path)[0] + ".kbx"
+
+def write_store(data: dict, out_path, signature=None):
+    """Write data (keys lowercased) as a .kbx store, atomically, tagged with signature."""
+    # keep the last value (in insertion order) for keys that collide after lowercasing
+    latest = {k.lower(): v for k, v in data.items()}
+    items = sorted((k.encode("utf-8"), json.dumps(v, ensure_ascii=False).encode("utf-8"))
+                   for k, v in latest.items())
+    offsets = array.array("Q")
+    pos = _KBX_HEADER.size + 8 * (2 * len(items) + 1)
+    for k, v in items:
+        offsets.append(pos)
+        pos += len(k)
+        offsets.append(pos)
+        pos += len(v)
+    offsets.append(pos)
+    sig = json.dumps(signature).encode("utf-8")
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_KBX_HEADER.pack(_KBX_MAGIC, len(items), len(sig)))
+        offsets.tofile(f)
+        for k, v in items:
+            f.write(k)
+            f.write(v)
+        f.write(sig)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, out_path)
+    return len(items)
+
+def convert_knowledge(path=KNOWLEDGE_FILE):
+    """Build knowledge.kbx from knowledge.json plus its journal; returns the entry count."""
+    with _file_lock(path, shared=True):
+        signature = _source_signature(path)  # taken first: a change while reading makes it stale
+        data = _read_all(path)
+    return write_store(data, store_path(path), signature)
+
+class MappedKnowledge(MutableMapping):
+    """
+    Knowledge mapping backed by a memory-mapped .kbx store.
+    Opening is constant time and the pages are shared between processes; writes
+    (e.g. /add, journal replay) go to a small in-memory overlay.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, sig_len = _KBX_HEADER.unpack_from(self._mm, 0)
+        if magic != _KBX_MAGIC:
+            raise ValueError(f"{path} is not a knowledge store")
+        start = _KBX_HEADER.size
+        self._off = memoryview(self._mm)[start:start + 8 * (2 * self._count + 1)].cast("Q")
+        end = self._off[2 * self._count]
+        try:
+            self.signature = json.loads(self._mm[end:end + sig_len]) if sig_len else None
+        except ValueError:
+            self.signature = None
+        self._overlay = {}
+        self._extra = 0  # overlay keys that are not in the store
+
+    def _find(self, key: str) -> int:
+        kb = key.encode("utf-8")
+        mm, off = self._mm, self._off
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[off[2 * mid]:off[2 * mid + 1]] < kb:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and mm[off[2 * lo]:off[2 * lo + 1]] == kb:
+            return lo
+        return -1
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        i = self._find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        return self.answer(i)
+
+    def answer(self, record: int):
+        """Decode the answer of store record number record (as yielded by records())."""
+        return json.loads(self._mm[self._off[2 * record + 1]:self._off[2 * record + 2]].decode("utf-8"))
+
+    def records(self):
+        """
+        Yield (key, answer, record) for every entry: record is the store record number,
+        or None for overlay entries, which only live in memory.
+        """
+        mm, off, overlay = self._mm, self._off, self._overlay
+        for i in range(self._count):
+            key = mm[off[2 * i]:off[2 * i + 1]].decode("utf-8")
+            if key not in overlay:
+                yield key, json.loads(mm[off[2 * i + 1]:off[2 * i + 2]].decode("utf-8")), i
+        for key, answer in list(overlay.items()):
+            yield key, answer, None
+
+    def __contains__(self, key):
+        return key in self._overlay or (isinstance(key, str) and self._find(key) >= 0)
+
+    def __setitem__(self, key, value):
+        if key not in self._overlay and self._find(key) < 0:
+            self._extra += 1
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        raise TypeError("knowledge store is append-only")
+
+    def __len__(self):
+        return self._count + self._extra
+
+    def __iter__(self):
+        mm, off = self._mm, self._off
+        for i in range(self._count):
+            key = mm[off[2 * i]:off[2 * i + 1]].decode("utf-8")
+            if key not in self._overlay:
+                yield key
+        yield from self._overlay
+
+def _open_fresh_store(path):
+    """The MappedKnowledge store for path if it was built from the current snapshot, else None."""
+    spath = store_path(path)
+    if not os.path.exists(spath):
+        return None
+    try:
+        store = MappedKnowledge(spath)
+    except (OSError, ValueError):
+        return None
+    return store if store.signature == _source_signature(path) else None
+
+# Load simple Q/A knowledge file if present
+def load_knowledge(path=KNOWLEDGE_FILE):
+    if not (os.path.exists(path) or os.path.exists(journal_path(path))):
+        return {}  # nothing to read: no lock file, and no error for a missing directory
+    with _file_lock(path, shared=True):
+        know = _open_fresh_store(path)
+        if know is not None:
+            for k, v in _replay_journal(path, {}).items():
+                know[k.lower()] = v
+            return know
+        data = _read_all(path)
+    return {k.lower(): v for k, v in data.items()}
+
+def append_entries(entries: dict, path=KNOWLEDGE_FILE, fsync=None):
+    """
+    Durably append Q/A pairs to the journal (O(1) per entry, no full rewrite).
+    fsync defaults to JOURNAL_FSYNC; compaction runs when the journal gets large.
+    """
+    fsync = JOURNAL_FSYNC if fsync is None else fsync
+    lines = "".join(json.dumps({"q": q, "a": a}, ensure_ascii=False) + "\n" for q, a in entries.items())
+    jpath = journal_path(path)
+    with _file_lock(path):
+        with open(jpath, "a+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    lines = "\n" + lines  # end a torn tail so it cannot swallow this record
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            size = f.tell()
+        if size > JOURNAL_COMPACT_BYTES:
+            _compact_locked(path)
+
+def compact_knowledge(path=KNOWLEDGE_FILE):
+    """Fold the journal into a fresh snapshot; returns the number of entries."""
+    with _file_lock(path):
+        return _compact_locked(path)
+
+def _compact_locked(path):
+    if os.path.isdir(path):
+        # shards are left alone; the journal folds into the highest-precedence shard
+        target = os.path.join(path, SHARD_JOURNAL)
+        snapshot = _replay_journal(path, _read_snapshot(target))
+    else:
+        target = path
+        snapshot = _read_all(path)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    data = _read_snapshot(path) if target != path else snapshot
+    if os.path.exists(store_path(path)):
+        write_store(data, store_path(path), _source_signature(path))
+    # a crash before truncation only replays entries already in the snapshot
+    jpath = journal_path(path)
+    if os.path.exists(jpath):
+        with open(jpath, "w", encoding="utf-8"):
+            pass
+    return len(data)
+
 KNOW = load_knowledge()
 
+# Retrieval index: tokenized inverted index with BM25 ranking
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was were be what who whom how why when where which of to in on at for "
+    "and or do does did i me my you your it its this that these those with about can should".split()
+)
+
+def tokenize(text: str):
+    """
+    Split text into lowercase word tokens.
+    A trailing plural 's' is stripped so 'retrospectives' matches 'retrospective'.
+    """
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+def _query_terms(text: str):
+    terms = set(tokenize(text))
+    content = terms - _STOPWORDS
+    return content or terms
+
+class KnowledgeIndex:
+    """
+    Inverted index (term -> postings) over Q/A entries, ranked with BM25.
+    Entries are (source, key, answer) tuples; key tokens are weighted above answer tokens.
+    Entries indexed from a MappedKnowledge store keep only their record number and
+    decode the answer when returned, so the index holds no second copy of the KB.
+    """
+    K1 = 1.2
+    B = 0.75
+    KEY_BOOST = 3
+    SORTED_POSTINGS = 256  # longer postings are kept in impact order for early exit
+
+    def __init__(self):
+        self.entries = []       # doc id -> (source, key, answer); answer None if in the store
+        self.records = array.array("q")  # doc id -> store record number, or -1
+        self.store = None       # MappedKnowledge the record numbers refer to
+        self.lengths = []       # doc id -> weighted token count
+        self.key_terms = []     # doc id -> frozenset of key tokens
+        self.postings = {}      # term -> {doc id: term frequency}
+        self.impacts = {}       # term -> long posting list in impact order (see _impact_order)
+        self.key_postings = {}  # term -> set of doc ids whose key contains term
+        self.key_fuzzy = TrigramIndex()  # typo-tolerant key lookup
+        self.by_key = {}        # (source, key) -> live doc id
+        self.removed = set()
+        self.total_len = 0
+        self.pending = []       # (source, mapping) indexed on first use
+        self.vector_source = None  # (know, path) for the lazily built VectorIndex
+        self._vectors = None
+        self._vector_lock = threading.Lock()
+
+    @property
+    def vectors(self):
+        """Semantic VectorIndex, loaded or built on first use."""
+        if self._vectors is None:
+            with self._vector_lock:
+                if self._vectors is None:
+                    know, path = self.vector_source or ({}, None)
+                    self._vectors = load_vectors(know, path)
+        return self._vectors
+
+    def semantic_match(self, text: str, source=None, min_score: float = 0.3):
+        """Return (source, key) of the entry closest in meaning to text, or None."""
+        hits = self.vectors.search(text, k=1, source=source)
+        if hits and hits[0][0] >= min_score:
+            return hits[0][1:]
+        return None
+
+    def __len__(self):
+        self._flush_pending()
+        return len(self.entries) - len(self.removed)
+
+    def defer(self, source: str, mapping):
+        """Index mapping's entries on first use instead of now (keeps cold start O(1))."""
+        self.pending.append((source, mapping))
+
+    def _flush_pending(self):
+        while self.pending:
+            source, mapping = self.pending.pop(0)
+            if isinstance(mapping, MappedKnowledge):
+                self.store = mapping
+                for k, v, record in mapping.records():
+                    self._add(source, k, v, record)
+            else:
+                # a copy: /add may grow the mapping while the warm-up thread indexes it
+                for k, v in list(mapping.items()):
+                    self._add(source, k, v)
+
+    def add(self, source: str, key: str, answer) -> int:
+        """Index an entry; re-adding an existing (source, key) replaces it."""
+        self._flush_pending()
+        if self._vectors is not None:
+            self._vectors.add(source, key, answer)
+        return self._add(source, key, answer)
+
+    def _add(self, source, key, answer, record=None):
+        old = self.by_key.get((source, key))
+        if old is not None:
+            self.removed.add(old)
+            self.total_len -= self.lengths[old]
+        doc = len(self.entries)
+        key_toks = tokenize(key)
+        toks = key_toks * self.KEY_BOOST + tokenize(str(answer))
+        if record is None:
+            self.entries.append((source, key, answer))
+            self.records.append(-1)
+        else:
+            self.entries.append((source, key, None))
+            self.records.append(record)
+        self.lengths.append(len(toks))
+        self.key_terms.append(frozenset(key_toks))
+        self.by_key[(source, key)] = doc
+        self.total_len += len(toks)
+        postings, impacts = self.postings, self.impacts
+        for tok, n in Counter(toks).items():
+            posting = postings.get(tok)
+            if posting is None:
+                postings[tok] = {doc: n}
+                continue
+            posting[doc] = n
+            sorted_posting = impacts.get(tok)
+            if sorted_posting is not None:
+                sorted_posting[3].append(doc)
+        for tok in set(key_toks):
+            self.key_postings.setdefault(tok, set()).add(doc)
+        self.key_fuzzy.add(doc, key)
+        return doc
+
+    def entry(self, doc: int):
+        """(source, key, answer) for a doc id, decoding store-backed answers on demand."""
+        source, key, answer = self.entries[doc]
+        record = self.records[doc]
+        if record >= 0:
+            answer = self.store.answer(record)
+        return source, key, answer
+
+    def _impact_order(self, term, posting, avg_len):
+        """
+        (scale, impacts, docs, tail) for a long posting list: its docs by decreasing BM25
+        term weight tf / (tf + norm), sorted once per term and reused. impacts[i] * scale
+        bounds the weight of docs[i:] under the current average length; docs added since
+        the sort are in tail.
+        """
+        entry = self.impacts.get(term)
+        if entry is not None:
+            sorted_avg, impacts, docs, tail = entry
+            ratio = avg_len / sorted_avg
+            # postings only grow, so a doc added while this list was sorted shows up here
+            if (len(docs) + len(tail) == len(posting) and len(tail) * 8 <= len(docs)
+                    and 0.8 <= ratio <= 1.25):
+                # a longer average only raises weights, by at most this factor
+                return max(1.0, ratio), impacts, docs, tail
+        k1, b = self.K1, self.B
+        c1, c2 = k1 * (1 - b), k1 * b / avg_len
+        lengths = self.lengths
+        ranked = sorted(((tf / (tf + c1 + c2 * lengths[d]), d) for d, tf in list(posting.items())),
+                        reverse=True)
+        impacts = array.array("d", [w for w, _ in ranked])
+        docs = array.array("I", [d for _, d in ranked])
+        self.impacts[term] = (avg_len, impacts, docs, [])
+        return 1.0, impacts, docs, ()
+
+    def prepare(self):
+        """
+        Put every long posting list in impact order ahead of the first queries.
+        Safe to run in a background thread; deferred entries are left to _flush_pending.
+        """
+        n_docs = len(self.entries) - len(self.removed)
+        if not n_docs:
+            return
+        avg_len = self.total_len / n_docs
+        for term, posting in list(self.postings.items()):
+            if len(posting) > self.SORTED_POSTINGS:
+                self._impact_order(term, posting, avg_len)
+
+    def search(self, query: str, k: int = 5, source=None):
+        """
+        Return up to k (score, doc id) pairs ranked by BM25, best first.
+        Short postings are scored exhaustively, term at a time. Long ones (common words)
+        are read in impact order, always advancing the list with the highest remaining
+        bound, and each new doc is scored in full with dict lookups into the other
+        long postings. Reading stops once the sum of the lists' remaining bounds (the
+        best any unseen doc could score) falls below the k-th best score, so the cost
+        follows k and the query rather than the length of the postings.
+        """
+        n_docs = len(self)  # also indexes anything deferred
+        if not n_docs:
+            return []
+        avg_len = self.total_len / n_docs
+        k1, b = self.K1, self.B
+        terms = []
+        for term in _query_terms(query):
+            posting = self.postings.get(term)
+            if posting:
+                # postings still hold replaced docs; capping df keeps idf (and the bounds) positive
+                df = min(len(posting), n_docs)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                terms.append((term, idf * (k1 + 1), posting))
+        lengths, removed, entries = self.lengths, self.removed, self.entries
+        c1, c2 = k1 * (1 - b), k1 * b / avg_len
+        short = [(weight, posting) for _, weight, posting in terms if len(posting) <= self.SORTED_POSTINGS]
+        long = [(term, weight, posting) for term, weight, posting in terms if len(posting) > self.SORTED_POSTINGS]
+        top = []  # min-heap of the best k (score, doc)
+
+        def push(score, doc):
+            if len(top) < k:
+                heapq.heappush(top, (score, doc))
+            elif (score, doc) > top[0]:
+                heapq.heapreplace(top, (score, doc))
+
+        # short postings term-at-a-time, then the long terms' share by lookup
+        partial = {}
+        for weight, posting in short:
+            for doc, tf in posting.items():
+                partial[doc] = partial.get(doc, 0.0) + weight * tf / (tf + c1 + c2 * lengths[doc])
+        for doc, score in partial.items():
+            if doc in removed or (source is not None and entries[doc][0] != source):
+                continue
+            if long:
+                norm = c1 + c2 * lengths[doc]
+                for _, weight, posting in long:
+                    tf = posting.get(doc)
+                    if tf:
+                        score += weight * tf / (tf + norm)
+            push(score, doc)
+        seen = set(partial)
+
+        def visit(docs):
+            for doc in docs:
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                if doc in removed or (source is not None and entries[doc][0] != source):
+                    continue
+                # every doc holding a short-posting term was scored above
+                norm = c1 + c2 * lengths[doc]
+                score = 0.0
+                for _, weight, posting in long:
+                    tf = posting.get(doc)
+                    if tf:
+                        score += weight * tf / (tf + norm)
+                push(score, doc)
+
+        cursors = []  # [bound for the rest of the list, position, weight * scale, impacts, docs]
+        for term, weight, posting in long:
+            scale, impacts, docs, tail = self._impact_order(term, posting, avg_len)
+            visit(tail)
+            cursors.append([weight * scale * impacts[0], 0, weight * scale, impacts, docs])
+        threshold = sum(c[0] for c in cursors)
+        while cursors and (len(top) < k or threshold >= top[0][0]):
+            # advance the list with the highest bound until it drops to the runner-up's
+            cursors.sort(key=lambda c: -c[0])
+            cursor = cursors[0]
+            floor = cursors[1][0] if len(cursors) > 1 else 0.0
+            bound, pos, weight, impacts, docs = cursor
+            end = len(docs)
+            start = pos
+            while True:
+                pos += 1
+                bound_next = weight * impacts[pos] if pos < end else 0.0
+                if bound_next <= floor or pos == end or pos - start >= 64:
+                    break
+            visit(docs[start:pos])
+            threshold += bound_next - bound
+            if pos == end:
+                cursors.remove(cursor)
+            else:
+                cursor[0], cursor[1] = bound_next, pos
+        return sorted(top, reverse=True)
+
+    def phrase_match(self, text: str, source=None):
+        """
+        Return the earliest-added entry whose key occurs as a phrase in text, or None.
+        Candidates come from key postings, so cost depends on the text, not the KB size.
+        """
+        self._flush_pending()
+        low = text.lower()
+        terms = set(tokenize(low))
+        best = None
+        for term in terms:
+            for doc in self.key_postings.get(term, ()):
+                if best is not None and doc >= best:
+                    continue
+                src, key, _ = self.entries[doc]
+                if (doc in self.removed or (source is not None and src != source)
+                        or not self.key_terms[doc] <= terms or key not in low):
+                    continue
+                best = doc
+        return None if best is None else self.entry(best)
+
+    def best_match(self, query: str, source=None, min_coverage: float = 0.5):
+        """
+        Return the top-ranked entry whose key covers at least min_coverage of the
+        query's content words, or None.
+        """
+        terms = _query_terms(query)
+        if not terms:
+            return None
+        def covers(doc):
+            return len(terms & self.key_terms[doc]) / len(terms) >= min_coverage
+
+        # the top hit usually qualifies, and a top-1 search stops far earlier than top-5
+        hits = self.search(query, k=1, source=source)
+        if not hits:
+            return None
+        if covers(hits[0][1]):
+            return self.entry(hits[0][1])
+        for _, doc in self.search(query, k=5, source=source)[1:]:
+            if covers(doc):
+                return self.entry(doc)
+        return None
+
+    def fuzzy_match(self, text: str, source=None, min_similarity: float = 0.7):
+        """
+        Return the entry whose key is most similar to text despite typos, or None.
+        Keys sharing one of the query's rarest exact words are tried first (cheap
+        even for huge KBs); the full trigram search only runs when none is close enough.
+        """
+        self._flush_pending()
+        def usable(doc):
+            return doc not in self.removed and (source is None or self.entries[doc][0] == source)
+
+        terms = sorted(_query_terms(text), key=lambda t: len(self.key_postings.get(t, ())))
+        candidates = set()
+        for term in terms[:2]:
+            candidates.update(self.key_postings.get(term, ()))
+        best = max(((s, d) for s, d in self.key_fuzzy.score(text, candidates) if usable(d)),
+                   default=None)
+        if best and best[0] >= min_similarity:
+            return self.entry(best[1])
+        for _, doc in self.key_fuzzy.search(text, min_similarity):
+            if usable(doc):
+                return self.entry(doc)
+        return None
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """
+    Approximate string lookup: trigram postings scored by Dice similarity.
+    Queries only expand the rarest trigrams (prefix filtering), so the candidate
+    set stays small as the number of strings grows. Only the text is kept per item;
+    its trigrams are recomputed for the few candidates that get scored.
+    """
+    def __init__(self):
+        self.texts = {}     # item -> lowercased text
+        self.sizes = {}     # item -> number of distinct trigrams
+        self.postings = {}  # trigram -> list of items
+
+    def add(self, item, text: str):
+        low = text.lower()
+        grams = _trigrams(low)
+        self.texts[item] = low
+        self.sizes[item] = len(grams)
+        postings = self.postings
+        for g in grams:
+            posting = postings.get(g)
+            if posting is None:
+                postings[g] = [item]
+            else:
+                posting.append(item)
+
+    def score(self, text: str, items):
+        """Yield (similarity, item) for the given items."""
+        query = _trigrams(text.lower())
+        for item in items:
+            grams = _trigrams(self.texts[item])
+            yield 2 * len(query & grams) / (len(query) + len(grams)), item
+
+    def search(self, text: str, min_similarity: float = 0.7):
+        """Return (similarity, item) pairs at or above min_similarity, best first."""
+        query = _trigrams(text.lower())
+        nq = len(query)
+        # Dice >= s implies the overlap is at least s*|q|/(2-s) trigrams, so every
+        # match shares one of the |q| - need + 1 rarest query trigrams
+        need = max(1, math.ceil(min_similarity * nq / (2 - min_similarity)))
+        rarest = sorted(query, key=lambda g: len(self.postings.get(g, ())))
+        prefix = rarest[:nq - need + 1]
+        hits = Counter()
+        for g in prefix:
+            hits.update(self.postings.get(g, ()))
+        # an item can gain at most one hit per trigram outside the prefix
+        rest = nq - len(prefix)
+        half = min_similarity / 2
+        # Dice >= s also needs |grams| >= s*|q|/(2-s): a hit-count floor checked before any lookup
+        least = half * (nq + min_similarity * nq / (2 - min_similarity)) - rest
+        results = []
+        for item, n in hits.items():
+            if n < least:
+                continue
+            size = self.sizes[item]
+            if n + rest < half * (nq + size):
+                continue
+            sim = 2 * len(query & _trigrams(self.texts[item])) / (nq + size)
+            if sim >= min_similarity:
+                results.append((sim, item))
+        results.sort(key=lambda r: -r[0])
+        return results
+
+# Semantic search: TF-IDF over hashed word unigrams and bigrams, cosine top-k.
+VECTOR_DIM = 1 << 20
+_VEC_MAGIC = b"TFV1"
+
+def _vector_features(text: str) -> dict:
+    """Map text to {hashed feature: 1 + log(tf)} over content-word unigrams and bigrams."""
+    # crc32 rather than hash(): feature ids must be stable across processes for the saved index
+    toks = [t for t in tokenize(text) if t not in _STOPWORDS]
+    mask = VECTOR_DIM - 1
+    counts = Counter(zlib.crc32(t.encode("utf-8")) & mask for t in toks)
+    counts.update(zlib.crc32(f"{a} {b}".encode("utf-8")) & mask for a, b in zip(toks, toks[1:]))
+    return {f: 1.0 + math.log(n) for f, n in counts.items()}
+
+class VectorIndex:
+    """
+    TF-IDF document vectors searched by cosine similarity.
+    The bulk of the matrix is a column-major base (feature -> doc ids, weights) that is
+    built once and persisted; entries added later go to a small in-memory delta.
+    IDF uses current counts at query time; base norms are refreshed on rebuild.
+    Scoring is a sparse matrix-vector product, vectorized with NumPy when installed.
+    """
+    def __init__(self):
+        self.keys = []             # doc id -> (source, key)
+        self.by_key = {}           # (source, key) -> live doc id
+        self.removed = set()
+        self.norms = array.array("f")
+        # base matrix in compressed sparse column form
+        self.features = array.array("I")   # sorted feature ids
+        self.offsets = array.array("Q", [0])
+        self.doc_ids = array.array("I")
+        self.weights = array.array("f")
+        self.delta = {}            # feature -> ([doc ids], [weights])
+        self._np = None
+
+    def __len__(self):
+        return len(self.keys) - len(self.removed)
+
+    def _new_doc(self, source, key):
+        old = self.by_key.get((source, key))
+        if old is not None:
+            self.removed.add(old)
+        doc = len(self.keys)
+        self.keys.append((source, key))
+        self.by_key[(source, key)] = doc
+        return doc
+
+    def _idf(self, df, n):
+        return math.log((1 + n) / (1 + df)) + 1.0
+
+    def _base_range(self, feature):
+        i = bisect.bisect_left(self.features, feature)
+        if i < len(self.features) and self.features[i] == feature:
+            return self.offsets[i], self.offsets[i + 1]
+        return 0, 0
+
+    def _df(self, feature):
+        lo, hi = self._base_range(feature)
+        extra = self.delta.get(feature)
+        return hi - lo + (len(extra[0]) if extra else 0)
+
+    def build(self, items):
+        """Replace the base with vectors for (source, key, text) items."""
+        # gather row-major first: per-document extends run at C speed
+        row_docs = array.array("I")
+        row_feats = array.array("I")
+        row_weights = array.array("f")
+        for source, key, text in items:
+            doc = self._new_doc(source, key)
+            feats = _vector_features(f"{key} {text}")
+            row_docs.extend([doc] * len(feats))
+            row_feats.extend(feats.keys())
+            row_weights.extend(feats.values())
+        if np is not None:
+            self._transpose_numpy(row_docs, row_feats, row_weights)
+        else:
+            self._transpose_python(row_docs, row_feats, row_weights)
+        self._np = None
+        return self
+
+    def _transpose_numpy(self, row_docs, row_feats, row_weights):
+        feats = np.frombuffer(row_feats, dtype=np.uint32)
+        order = np.argsort(feats, kind="stable")
+        sorted_feats = feats[order]
+        features, starts, df = np.unique(sorted_feats, return_index=True, return_counts=True)
+        docs = np.frombuffer(row_docs, dtype=np.uint32)[order]
+        weights = np.frombuffer(row_weights, dtype=np.float32)[order]
+        n = len(self.keys)
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        contrib = (weights * np.repeat(idf, df)) ** 2
+        norms = np.sqrt(np.bincount(docs, weights=contrib, minlength=n)).astype(np.float32)
+        norms[norms == 0] = 1.0
+        self.features = array.array("I", features.astype(np.uint32).tobytes())
+        self.offsets = array.array("Q", np.append(starts, len(docs)).astype(np.uint64).tobytes())
+        self.doc_ids = array.array("I", docs.tobytes())
+        self.weights = array.array("f", weights.tobytes())
+        self.norms = array.array("f", norms.tobytes())
+
+    def _transpose_python(self, row_docs, row_feats, row_weights):
+        columns = {}  # feature -> ([doc ids], [weights])
+        for doc, f, w in zip(row_docs, row_feats, row_weights):
+            col = columns.get(f)
+            if col is None:
+                columns[f] = ([doc], [w])
+            else:
+                col[0].append(doc)
+                col[1].append(w)
+        n = len(self.keys)
+        norms = [0.0] * n
+        self.features = array.array("I", sorted(columns))
+        self.offsets = array.array("Q", [0])
+        self.doc_ids = array.array("I")
+        self.weights = array.array("f")
+        for f in self.features:
+            ids, ws = columns[f]
+            idf2 = self._idf(len(ids), n) ** 2
+            for d, w in zip(ids, ws):
+                norms[d] += w * w * idf2
+            self.doc_ids.extend(ids)
+            self.weights.extend(ws)
+            self.offsets.append(len(self.doc_ids))
+        self.norms = array.array("f", (math.sqrt(v) or 1.0 for v in norms))
+
+    def add(self, source: str, key: str, text):
+        """Index one entry incrementally (used for /add and journal replay)."""
+        doc = self._new_doc(source, key)
+        feats = _vector_features(f"{key} {text}")
+        n = len(self)
+        norm2 = 0.0
+        for f, w in feats.items():
+            col = self.delta.setdefault(f, ([], []))
+            col[0].append(doc)
+            col[1].append(w)
+            norm2 += (w * self._idf(self._df(f), n)) ** 2
+        self._np = None  # drop the cached NumPy arrays before norms changes
+        self.norms.append(math.sqrt(norm2) or 1.0)
+
+    def search(self, text: str, k: int = 5, source=None):
+        """Return up to k (cosine, source, key) tuples, best first."""
+        feats = _vector_features(text)
+        n = len(self)
+        if not feats or not n:
+            return []
+        terms = []
+        qnorm2 = 0.0
+        for f, w in feats.items():
+            lo, hi = self._base_range(f)
+            extra = self.delta.get(f)
+            df = hi - lo + (len(extra[0]) if extra else 0)
+            if not df:
+                continue
+            idf = self._idf(df, n)
+            qnorm2 += (w * idf) ** 2
+            terms.append((w * idf * idf, lo, hi, extra))
+        if not terms:
+            return []
+        qnorm = math.sqrt(qnorm2)
+        if np is not None:
+            ranked = self._search_numpy(terms, k, source)
+        else:
+            ranked = self._search_python(terms, k, source)
+        return [(score / qnorm, *self.keys[doc]) for score, doc in ranked]
+
+    def _usable(self, doc, source):
+        return doc not in self.removed and (source is None or self.keys[doc][0] == source)
+
+    def _search_python(self, terms, k, source):
+        scores = {}
+        ids, ws = self.doc_ids, self.weights
+        for coef, lo, hi, extra in terms:
+            for i in range(lo, hi):
+                d = ids[i]
+                scores[d] = scores.get(d, 0.0) + coef * ws[i]
+            if extra:
+                for d, w in zip(*extra):
+                    scores[d] = scores.get(d, 0.0) + coef * w
+        norms = self.norms
+        hits = ((s / norms[d], d) for d, s in scores.items() if self._usable(d, source))
+        return heapq.nlargest(k, hits)
+
+    def _search_numpy(self, terms, k, source):
+        if self._np is None or len(self._np[2]) != len(self.norms):
+            # views of the base, which build() replaces rather than resizes; norms grows
+            # with add(), and a view would make array.append raise BufferError, so copy it
+            self._np = (np.frombuffer(self.doc_ids, dtype=np.uint32),
+                        np.frombuffer(self.weights, dtype=np.float32),
+                        np.array(self.norms, dtype=np.float32))
+        ids, ws, norms = self._np
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        for coef, lo, hi, extra in terms:
+            if hi > lo:
+                scores[ids[lo:hi]] += coef * ws[lo:hi]
+            if extra:
+                scores[np.asarray(extra[0])] += coef * np.asarray(extra[1], dtype=np.float32)
+        scores /= norms
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > 4 * k:
+            candidates = candidates[np.argpartition(-scores[candidates], 4 * k)[:4 * k]]
+        ranked = sorted(((float(scores[d]), int(d)) for d in candidates), reverse=True)
+        return [(s, d) for s, d in ranked if self._usable(d, source)][:k]
+
+    def save(self, path, signature):
+        """Persist the base matrix (not the delta) atomically."""
+        header = json.dumps({"dim": VECTOR_DIM, "signature": signature, "keys": self.keys,
+                             "removed": sorted(self.removed), "nf": len(self.features),
+                             "nnz": len(self.doc_ids)}).encode("utf-8")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_VEC_MAGIC + struct.pack("=I", len(header)) + header)
+            for arr in (self.features, self.offsets, self.doc_ids, self.weights, self.norms):
+                arr.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """Load a saved base; returns None if missing, corrupt or built from other data."""
+        try:
+            with open(path, "rb") as f:
+                if f.read(4) != _VEC_MAGIC:
+                    return None
+                (hlen,) = struct.unpack("=I", f.read(4))
+                header = json.loads(f.read(hlen).decode("utf-8"))
+                if header["dim"] != VECTOR_DIM or (signature is not None and header["signature"] != signature):
+                    return None
+                self = cls()
+                n = len(header["keys"])
+                for name, count in (("features", header["nf"]), ("offsets", header["nf"] + 1),
+                                    ("doc_ids", header["nnz"]), ("weights", header["nnz"]), ("norms", n)):
+                    arr = array.array(getattr(self, name).typecode)
+                    arr.fromfile(f, count)
+                    setattr(self, name, arr)
+        except (OSError, EOFError, ValueError, KeyError):
+            return None
+        self.keys = [tuple(k) for k in header["keys"]]
+        self.removed = set(header["removed"])
+        self.by_key = {k: i for i, k in enumerate(self.keys) if i not in self.removed}
+        return self
+
+def vectors_path(path=KNOWLEDGE_FILE):
+    return os.path.splitext(path)[0] + ".tfidf"
+
+def _vector_signature(path):
+    sig = _source_signature(path)
+    try:
+        st = os.stat(store_path(path))
+        sig.append([os.path.basename(store_path(path)), st.st_size, st.st_mtime_ns])
+    except OSError:
+        pass
+    return sig
+
+def load_vectors(know, path=None):
+    """
+    Vector index for know plus SCRUM_KB. With a path, a saved base built from the
+    same snapshot is reused and only journal entries are vectorized; otherwise the
+    base is rebuilt and saved next to the knowledge file.
+    """
+    vectors = None
+    if path is not None:
+        signature = _vector_signature(path)
+        vectors = VectorIndex.load(vectors_path(path), signature)
+        if vectors is not None:
+            for k, v in _replay_journal(path, {}).items():
+                vectors.add("kb", k.lower(), v)
+    if vectors is None:
+        vectors = VectorIndex().build(("kb", k, v) for k, v in know.items())
+        if path is not None and know:
+            try:
+                vectors.save(vectors_path(path), signature)
+            except OSError:
+                pass
+    for k, v in SCRUM_KB.items():
+        vectors.add("scrum", k, v)
+    return vectors
+
 # Built-in Scrum knowledge base (concise but comprehensive)
 SCRUM_KB = {
     "overview": (
@@ -154,6 +1386,285 @@ SCRUM_KB = {
     )
 }
 
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of phrases.
+    find() reports every phrase occurring in a text in a single left-to-right pass.
+    """
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [frozenset()]
+        for phrase in phrases:
+            state = 0
+            for ch in phrase:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(frozenset())
+                state = nxt
+            self.out[state] = self.out[state] | {phrase}
+        # breadth-first pass to wire failure links and merge outputs
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] | self.out[self.fail[nxt]]
+                queue.append(nxt)
+
+    def find(self, text: str) -> set:
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+SCRUM_TRIGGERS = ("scrum", "sprint", "product backlog", "definition of done", "scrum master", "product owner")
+GREETINGS = ("hello", "hi", "hey", "good morning", "good afternoon")
+TIME_WORDS = ("time", "date", "what", "current", "today")
+
+# SCRUM_KB order decides which topic wins when several are mentioned
+_SCRUM_ORDER = {k: i for i, k in enumerate(SCRUM_KB)}
+
+def build_index(know, path=None) -> KnowledgeIndex:
+    index = KnowledgeIndex()
+    index.vector_source = (know, path)
+    for k, v in SCRUM_KB.items():
+        index.add("scrum", k, v)
+    # indexed by the first query or start_index_warmup(), not at import: --compact,
+    # --convert and the like never need it, and decoding a .kbx would undo its O(1) open
+    index.defer("kb", know)
+    return index
+
+KB_INDEX = build_index(KNOW, KNOWLEDGE_FILE)
+# (KNOW, KB_INDEX) replaced as one object so readers always see a matching pair
+KB_STATE = (KNOW, KB_INDEX)
+# bumped whenever the KB changes so caches of derived answers can invalidate
+KB_GENERATION = 0
+
+RELOAD_METRICS = {"reloads": 0, "entries": len(KNOW), "last_duration": 0.0,
+                  "last_reload": None, "last_error": None}
+_reload_lock = threading.Lock()
+
+def _install_knowledge(know, index):
+    global KNOW, KB_INDEX, KB_STATE, KB_GENERATION
+    KB_STATE = (know, index)
+    KB_INDEX = index
+    KNOW = know
+    KB_GENERATION += 1
+
+def reload_knowledge(path=KNOWLEDGE_FILE):
+    """
+    Reload the knowledge file and rebuild the retrieval index, then swap both in.
+    Safe to call from any thread; the previous KB keeps serving until the swap.
+    """
+    with _reload_lock:
+        t0 = time.perf_counter()
+        try:
+            know = load_knowledge(path)
+            index = build_index(know, path)
+            len(index)  # finish any deferred indexing here rather than in respond()
+            index.prepare()
+            index.vectors
+        except Exception as e:
+            RELOAD_METRICS["last_error"] = str(e)
+            raise
+        _install_knowledge(know, index)
+        RELOAD_METRICS.update(reloads=RELOAD_METRICS["reloads"] + 1, entries=len(know),
+                              last_duration=time.perf_counter() - t0,
+                              last_reload=datetime.datetime.now().isoformat(timespec="seconds"),
+                              last_error=None)
+    return know
+
+def start_index_warmup(path=KNOWLEDGE_FILE) -> threading.Thread:
+    """
+    Finish indexing the KB in a background thread so no question waits for it.
+    build_index defers the KB: until its full index is swapped in, an index of the
+    built-in topics (plus this session's /add entries) serves fuzzy and ranked
+    matches, while exact KB questions are still answered from the KB itself.
+    """
+    know, index = KB_STATE
+    interim = None
+    if index.pending:
+        interim = build_index({})
+        _install_knowledge(know, interim)
+
+    def warm():
+        len(index)
+        index.prepare()
+        index.vectors
+        if interim is None:
+            return
+        with _reload_lock:
+            if KB_STATE[1] is not interim:
+                return  # a reload installed a complete index meanwhile
+            for (source, key), doc in list(interim.by_key.items()):
+                if source == "kb":
+                    index.add(source, key, interim.entry(doc)[2])
+            _install_knowledge(know, index)
+
+    thread = threading.Thread(target=warm, name="index-warmup", daemon=True)
+    thread.start()
+    return thread
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify watching a few directories."""
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, *directories):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def read_names(self, timeout):
+        """Wait up to timeout seconds and return the set of file names that changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        names = set()
+        if not ready:
+            return names
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        pos = 0
+        while pos + self._EVENT.size <= len(buf):
+            _, _, _, length = self._EVENT.unpack_from(buf, pos)
+            pos += self._EVENT.size
+            names.add(os.fsdecode(buf[pos:pos + length].rstrip(b"\0")))
+            pos += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class KnowledgeWatcher(threading.Thread):
+    """
+    Background thread that reloads knowledge when the snapshot (or any shard), journal
+    or .kbx store changes. Uses inotify where available and falls back to polling mtimes.
+    Journal growth only reloads when the new lines hold entries the KB lacks, so this
+    process's own /add appends (already in memory) do not trigger a full reload.
+    """
+    def __init__(self, path=KNOWLEDGE_FILE, interval=1.0, debounce=0.2):
+        super().__init__(name="knowledge-watcher", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.debounce = debounce
+        self.journal = journal_path(path)
+        self.files = {os.path.basename(p) for p in (path, store_path(path))}
+        self._journal_offset = 0  # journal bytes already checked against the KB
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _signature(self):
+        sig = []
+        paths = [os.path.join(os.path.dirname(self.path), name) for name in sorted(self.files)]
+        if os.path.isdir(self.path):
+            paths += shard_files(self.path)
+        for p in paths:
+            try:
+                st = os.stat(p)
+                sig.append((p, st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return sig
+
+    def _relevant(self, names):
+        if names & self.files:
+            return True
+        return os.path.isdir(self.path) and any(n.endswith(".json") for n in names)
+
+    def _journal_is_known(self):
+        """
+        Whether the KB already holds every entry appended to the journal since the last
+        check. Only the new complete lines are read; a shrunken journal (compaction) or
+        an unknown entry means a reload is needed.
+        """
+        try:
+            with open(self.journal, "rb") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end == self._journal_offset:
+                    return True
+                if end < self._journal_offset:
+                    return False
+                f.seek(self._journal_offset)
+                data = f.read(end - self._journal_offset)
+        except FileNotFoundError:
+            return self._journal_offset == 0
+        except OSError:
+            return False
+        complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+        self._journal_offset += complete
+        entries = dict(filter(None, map(_journal_record, data[:complete].splitlines())))
+        know = KB_STATE[0]
+        return all(q.lower() in know and know[q.lower()] == a for q, a in entries.items())
+
+    def _reload(self):
+        try:
+            offset = os.path.getsize(self.journal)
+        except OSError:
+            offset = 0
+        try:
+            reload_knowledge(self.path)
+        except Exception:
+            return  # keep serving the previous KB; the error is in RELOAD_METRICS
+        self._journal_offset = offset  # later appends are checked from here
+
+    def run(self):
+        dirs = [os.path.dirname(os.path.abspath(self.path))]
+        if os.path.isdir(self.path):
+            dirs.append(self.path)
+        try:
+            notify = _Inotify(*dirs)
+        except (OSError, AttributeError):
+            notify = None
+        if notify is not None:
+            try:
+                journal = os.path.basename(self.journal)
+                while not self._stop_event.is_set():
+                    names = notify.read_names(self.interval)
+                    if self._relevant(names) or journal in names:
+                        # let a burst of writes settle, then collect its remaining events
+                        self._stop_event.wait(self.debounce)
+                        while more := notify.read_names(0):
+                            names |= more
+                        if self._relevant(names) or not self._journal_is_known():
+                            self._reload()
+            finally:
+                notify.close()
+            return
+        last = self._signature()
+        while not self._stop_event.wait(self.interval):
+            sig = self._signature()
+            if sig != last or not self._journal_is_known():
+                self._stop_event.wait(self.debounce)
+                self._reload()
+                last = self._signature()
+
 def scrum_topics_list() -> str:
     keys = sorted(SCRUM_KB.keys())
     return "Available Scrum topics:\n" + ", ".join(keys)
@@ -164,78 +1675,490 @@ def scrum_answer(topic: str) -> str:
         return SCRUM_KB["overview"]
     if t in SCRUM_KB:
         return SCRUM_KB[t]
-    # try fuzzy match by keyword
+    # a topic named inside the text, then the first topic (in SCRUM_KB order) containing
+    # the text, so "sprint" means "sprint planning"; then a misspelt or best-ranked topic
+    hit = KB_INDEX.phrase_match(t, "scrum")
+    if hit:
+        return hit[2]
     for k in SCRUM_KB:
-        if t in k or k in t:
+        if t in k:
             return SCRUM_KB[k]
+    hit = KB_INDEX.fuzzy_match(t, "scrum", 0.6) or KB_INDEX.best_match(t, "scrum", min_coverage=0.3)
+    if hit:
+        return hit[2]
     return f"No detailed info for '{topic}'. Use /scrum to list topics."
 
-# Simple responder extended for Scrum
+class ResponseCache:
+    """
+    Bounded LRU cache of answers keyed on the normalized prompt, with a TTL.
+    Cleared automatically when the knowledge generation changes (reload or /add).
+    """
+    def __init__(self, maxsize=10000, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires, answer)
+        self._lock = threading.Lock()
+        self._generation = KB_GENERATION
+        self.hits = self.misses = self.bypassed = 0
+        self.bytes = 0
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(prompt.lower().split())
+
+    @staticmethod
+    def _size(key, answer):
+        return sys.getsizeof(key) + sys.getsizeof(answer)
+
+    def _check_generation(self):
+        if self._generation != KB_GENERATION:
+            self._data.clear()
+            self.bytes = 0
+            self._generation = KB_GENERATION
+
+    def get(self, key):
+        with self._lock:
+            self._check_generation()
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                    self.bytes -= self._size(key, item[1])
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, answer, generation=None):
+        """Store answer; skipped if it was computed under a KB generation that is gone."""
+        with self._lock:
+            if generation is not None and generation != KB_GENERATION:
+                return
+            self._check_generation()
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= self._size(key, old[1])
+            self._data[key] = (time.monotonic() + self.ttl, answer)
+            self.bytes += self._size(key, answer)
+            while len(self._data) > self.maxsize:
+                k, (_, a) = self._data.popitem(last=False)
+                self.bytes -= self._size(k, a)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"Cache: {len(self._data)}/{self.maxsize} entries, ~{self.bytes / 1024:.0f} KiB, "
+                f"hit rate {rate:.1%} ({self.hits} hits, {self.misses} misses, {self.bypassed} bypassed)")
+
+RESPONSE_CACHE = ResponseCache()
+
+class LatencyHistogram:
+    """Latency histogram with power-of-two microsecond buckets."""
+    BUCKETS = 24  # up to ~8 s
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.n = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int):
+        self.counts[min((ns // 1000).bit_length(), self.BUCKETS - 1)] += 1
+        self.n += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p: float) -> float:
+        """Upper bound in microseconds of the bucket holding the p-th percentile."""
+        target = self.n * p / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return float(1 << i)
+        return 0.0
+
+    def summary(self) -> dict:
+        return {"count": self.n,
+                "mean_us": self.total_ns / self.n / 1000 if self.n else 0.0,
+                "p50_us": self.percentile(50), "p99_us": self.percentile(99),
+                "max_us": self.max_ns / 1000}
+
+class Instrumentation:
+    """
+    Per-branch call counters and latency histograms for respond() and slash commands.
+    Recording costs two clock reads and a few list updates; disable to skip even that.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = {}  # name -> LatencyHistogram
+        self.started = time.time()
+
+    def record(self, name: str, ns: int):
+        hist = self.timings.get(name)
+        if hist is None:
+            hist = self.timings.setdefault(name, LatencyHistogram())
+        hist.record(ns)
+
+    @contextmanager
+    def timed(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - t0)
+
+    def reset(self):
+        self.timings = {}
+        self.started = time.time()
+
+    def snapshot(self) -> dict:
+        return {"since": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "timings": {name: h.summary() for name, h in sorted(self.timings.items())}}
+
+    def report(self) -> str:
+        if not self.timings:
+            return "Branches: no data" + ("" if self.enabled else " (instrumentation off)")
+        lines = [f"{'branch':<22} {'calls':>8} {'mean us':>9} {'p50 us':>8} {'p99 us':>8}"]
+        for name, s in sorted(self.snapshot()["timings"].items(), key=lambda kv: -kv[1]["count"]):
+            lines.append(f"{name:<22} {s['count']:>8} {s['mean_us']:>9.1f} {s['p50_us']:>8.0f} {s['p99_us']:>8.0f}")
+        return "\n".join(lines)
+
+INSTRUMENT = Instrumentation()
+
+class StatsDumper(threading.Thread):
+    """Periodically write the instrumentation snapshot to a JSON file."""
+    def __init__(self, path, interval=60.0):
+        super().__init__(name="stats-dumper", daemon=True)
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def dump(self):
+        data = INSTRUMENT.snapshot()
+        data["dumped"] = datetime.datetime.now().isoformat(timespec="seconds")
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.dump()
+            except OSError:
+                pass
+
 def respond(prompt: str) -> str:
+    t0 = time.perf_counter_ns() if INSTRUMENT.enabled else 0
+    key = ResponseCache.normalize(prompt)
+    cached = RESPONSE_CACHE.get(key)
+    if cached is not None:
+        if t0:
+            INSTRUMENT.record("cache hit", time.perf_counter_ns() - t0)
+        return cached
+    generation = KB_GENERATION  # a reload or /add while routing makes the answer stale
+    branch, answer = _route(prompt)
+    if branch in ROUTER.uncacheable:
+        RESPONSE_CACHE.bypassed += 1
+    else:
+        RESPONSE_CACHE.put(key, answer, generation)
+    if t0:
+        INSTRUMENT.record(branch, time.perf_counter_ns() - t0)
+    return answer
+
+def _route(prompt: str):
+    """Answer prompt through the intent router; returns (intent name, answer)."""
     q = prompt.strip()
     if not q:
-        return "Please type a question or /help for commands."
-    low = q.lower()
-    # Built-in command: /scrum
-    if low.startswith("/scrum"):
-        parts = q.split(" ", 1)
-        if len(parts) == 1:
-            return scrum_topics_list()
-        else:
-            return scrum_answer(parts[1])
-    # allow user to ask general Scrum questions
-    if "scrum" in low or any(w in low for w in ("sprint", "product backlog", "definition of done", "scrum master", "product owner")):
-        # try to find a relevant topic word
-        for key in SCRUM_KB:
-            if key in low:
-                return SCRUM_KB[key]
-        # fallback to overview
-        return SCRUM_KB["overview"]
+        return "empty", "Please type a question or /help for commands."
+    return ROUTER.dispatch(q)
+
+class Query:
+    """A prompt prepared once for all intent handlers."""
+    __slots__ = ("text", "low", "first", "found", "know", "index")
+
+    def __init__(self, text, found, know, index):
+        self.text = text
+        self.low = text.lower()
+        self.first = self.low.split(" ", 1)[0]
+        self.found = found  # every registered phrase occurring in the prompt
+        self.know = know
+        self.index = index
+
+class Intent:
+    __slots__ = ("name", "handler", "priority", "order")
+
+    def __init__(self, name, handler, priority, order):
+        self.name = name
+        self.handler = handler
+        self.priority = priority
+        self.order = order
+
+class IntentRouter:
+    """
+    Registry of intents tried in priority order (lower first).
+    Each intent declares cheap pre-filters: first tokens, trigger phrases (all matched
+    by one Aho-Corasick pass), characters, or a regex. Only intents whose filter
+    matches are invoked, so adding intents does not add per-prompt scans. A handler
+    takes a Query and returns an answer, or None to let the next intent try.
+    """
+    def __init__(self):
+        self.intents = []
+        self.by_token = {}    # first token -> [Intent]
+        self.by_phrase = {}   # phrase -> [Intent]
+        self.by_char = {}     # character -> [Intent]
+        self.by_regex = []    # (compiled regex, Intent)
+        self.always = []      # intents without a filter
+        self.watched = set()  # phrases reported to handlers without selecting anything
+        self.uncacheable = set()
+        self._matcher = None
+
+    def register(self, name, handler, priority=100, first_tokens=(), phrases=(), chars="",
+                 pattern=None, cacheable=True):
+        intent = Intent(name, handler, priority, len(self.intents))
+        self.intents.append(intent)
+        for tok in first_tokens:
+            self.by_token.setdefault(tok.lower(), []).append(intent)
+        for phrase in phrases:
+            self.by_phrase.setdefault(phrase.lower(), []).append(intent)
+        for ch in chars:
+            self.by_char.setdefault(ch, []).append(intent)
+        if pattern is not None:
+            self.by_regex.append((re.compile(pattern) if isinstance(pattern, str) else pattern, intent))
+        if not (first_tokens or phrases or chars or pattern is not None):
+            self.always.append(intent)
+        if not cacheable:
+            self.uncacheable.add(name)
+        self._matcher = None
+        return intent
+
+    def watch(self, phrases):
+        """Detect phrases in the same pass (visible as Query.found) without routing on them."""
+        self.watched.update(p.lower() for p in phrases)
+        self._matcher = None
+
+    def matcher(self) -> PhraseMatcher:
+        if self._matcher is None:
+            self._matcher = PhraseMatcher(set(self.by_phrase) | self.watched)
+        return self._matcher
+
+    def candidates(self, query: Query):
+        selected = set(self.always)
+        selected.update(self.by_token.get(query.first, ()))
+        for phrase in query.found:
+            selected.update(self.by_phrase.get(phrase, ()))
+        if self.by_char:
+            for ch in self.by_char.keys() & set(query.text):
+                selected.update(self.by_char[ch])
+        for regex, intent in self.by_regex:
+            if intent not in selected and regex.search(query.text):
+                selected.add(intent)
+        return sorted(selected, key=lambda i: (i.priority, i.order))
+
+    def dispatch(self, text: str):
+        know, index = KB_STATE
+        query = Query(text, self.matcher().find(text.lower()), know, index)
+        for intent in self.candidates(query):
+            answer = intent.handler(query)
+            if answer is not None:
+                return intent.name, answer
+        return "none", None
+
+# Built-in intents, registered in the original routing order
+def _intent_scrum_command(query):
+    if not query.low.startswith("/scrum"):
+        return None
+    parts = query.text.split(" ", 1)
+    if len(parts) == 1:
+        return scrum_topics_list()
+    return scrum_answer(parts[1])
+
+def _intent_scrum(query):
+    # try to find a relevant topic word
+    topics = [k for k in query.found if k in _SCRUM_ORDER]
+    if topics:
+        return SCRUM_KB[min(topics, key=_SCRUM_ORDER.get)]
+    hit = query.index.fuzzy_match(query.low, "scrum")
+    if hit:
+        return hit[2]
+    # fallback to overview
+    return SCRUM_KB["overview"]
+
+def _intent_kb(query):
     # direct knowledge match from external knowledge.json
-    if low in KNOW:
-        return KNOW[low]
-    # greetings
-    if any(g in low for g in ("hello", "hi", "hey", "good morning", "good afternoon")):
-        return "Hello. How can I help you today?"
-    if "time" in low and ("what" in low or "current" in low):
+    if query.low in query.know:
+        return query.know[query.low]
+    return None
+
+def _intent_greeting(query):
+    return "Hello. How can I help you today?"
+
+def _intent_time(query):
+    if "what" in query.found or "current" in query.found:
         return "Current time: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    # date
-    if "date" in low and ("what" in low or "today" in low):
+    return None
+
+def _intent_date(query):
+    if "what" in query.found or "today" in query.found:
         return "Today's date: " + datetime.date.today().isoformat()
-    # simple math: detect arithmetic characters and try to eval
-    if any(ch in q for ch in "+-*/%()") and any(ch.isdigit() for ch in q):
-        try:
-            result = safe_eval(q)
-            return f"Result: {result}"
-        except Exception:
-            pass
+    return None
+
+def _intent_math(query):
+    # simple math: arithmetic characters plus a digit
+    if not any(ch.isdigit() for ch in query.text):
+        return None
+    try:
+        return f"Result: {safe_eval(query.text)}"
+    except Exception:
+        return None
+
+def _intent_define(query):
     # definitions from knowledge keys like "define X" or "what is X"
-    if low.startswith("define ") or low.startswith("what is "):
-        key = low.split(" ", 1)[1].strip()
-        if key in KNOW:
-            return KNOW[key]
-        else:
-            return f"I don't have a definition for '{key}'. You can add it to {KNOWLEDGE_FILE}."
-    # fallback
+    for prefix in ("define ", "what is "):
+        if query.low.startswith(prefix):
+            key = query.low[len(prefix):].strip()
+            break
+    else:
+        return None
+    if key in query.know:
+        return query.know[key]
+    hit = query.index.fuzzy_match(key, "kb") or query.index.best_match(key, "kb")
+    if hit:
+        return hit[2]
+    return f"I don't have a definition for '{key}'. You can add it to {KNOWLEDGE_FILE}."
+
+def _intent_closest(query):
+    # a misspelt known question or topic, else the closest question in the external KB
+    hit = query.index.fuzzy_match(query.low) or query.index.best_match(query.low, "kb")
+    return hit[2] if hit else None
+
+def _intent_semantic(query):
+    # nearest entry by TF-IDF cosine similarity
+    hit = query.index.semantic_match(query.low)
+    if hit is None:
+        return None
+    source, key = hit
+    if source == "scrum":
+        return SCRUM_KB.get(key)
+    return query.know.get(key)
+
+def _intent_fallback(query):
     return ("I don't know the exact answer. Try rephrasing, ask a specific Scrum question, "
             "or use /scrum to list topics. You can also add Q/A via /add or /export_scrum to save the built-in Scrum KB.")
 
+def build_default_router() -> IntentRouter:
+    router = IntentRouter()
+    router.watch(tuple(SCRUM_KB) + TIME_WORDS)
+    router.register("scrum_command", _intent_scrum_command, 10, pattern=r"^/scrum")
+    router.register("scrum", _intent_scrum, 20, phrases=SCRUM_TRIGGERS)
+    router.register("kb", _intent_kb, 30)
+    router.register("greeting", _intent_greeting, 40, phrases=GREETINGS)
+    router.register("time", _intent_time, 50, phrases=("time",), cacheable=False)
+    router.register("date", _intent_date, 60, phrases=("date",), cacheable=False)
+    router.register("math", _intent_math, 70, chars="+-*/%()")
+    router.register("define", _intent_define, 80, first_tokens=("define", "what"))
+    router.register("closest", _intent_closest, 900)
+    router.register("semantic", _intent_semantic, 950)
+    router.register("fallback", _intent_fallback, 1000)
+    return router
+
+ROUTER = build_default_router()
+
+def register_intent(name, handler, priority=100, **filters):
+    """Add a custom intent to the shared router; see IntentRouter.register."""
+    return ROUTER.register(name, handler, priority, **filters)
+
 def export_scrum(path=KNOWLEDGE_FILE) -> str:
     try:
-        # merge existing knowledge with scrum kb (lowercased keys)
-        existing = {}
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                existing = json.load(f) or {}
-        merged = existing.copy()
-        for k, v in SCRUM_KB.items():
-            merged[k] = v
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(merged, f, indent=2, ensure_ascii=False)
+        append_entries(SCRUM_KB, path)
         return f"Exported Scrum knowledge to {path} ({len(SCRUM_KB)} topics)."
     except Exception as e:
         return f"Failed to export: {e}"
 
+HELP_TEXT = ("/help    show this help\n/exit    quit\n/reload  reload knowledge.json\n/stats   show knowledge, cache and per-branch latency stats (/stats on|off|reset)\n/add     add Q/A to knowledge file"
+             " (or /add <question> = <answer>)\n/scrum   list Scrum topics or /scrum <topic>\n"
+             "/export_scrum   save built-in Scrum KB to knowledge.json")
+
+def remember(question: str, answer: str):
+    """Add a Q/A pair to the in-memory knowledge and index."""
+    global KB_GENERATION
+    know, index = KB_STATE
+    know[question] = answer
+    index.add("kb", question, answer)
+    KB_GENERATION += 1
+
+def save_entry(question: str, answer: str, path=KNOWLEDGE_FILE) -> str:
+    try:
+        append_entries({question: answer}, path)
+        return f"Saved to {path}"
+    except Exception as e:
+        return f"Failed to save: {e}"
+
+def add_knowledge(question: str, answer: str) -> str:
+    q = question.strip().lower()
+    a = answer.strip()
+    if not q:
+        return "Empty question, aborted."
+    remember(q, a)
+    return save_entry(q, a)
+
+def stats_report() -> str:
+    m = RELOAD_METRICS
+    return (f"Knowledge: {len(KB_STATE[0])} entries, {m['reloads']} reloads, "
+            f"last reload {m['last_duration'] * 1000:.0f} ms at {m['last_reload'] or 'never'}"
+            + (f", last error: {m['last_error']}" if m["last_error"] else "")
+            + "\n" + RESPONSE_CACHE.report() + "\n" + INSTRUMENT.report())
+
+def _parse_add(line: str):
+    """Split '/add <question> = <answer>' into (question, answer), or None."""
+    q, sep, a = line[len("/add"):].partition("=")
+    return (q.strip().lower(), a.strip()) if sep else None
+
+def handle_command(line: str) -> str:
+    """Answer a slash command other than /exit."""
+    if line.lower().startswith("/scrum"):
+        return respond(line)  # timed once by respond(), as its intent or a cache hit
+    with INSTRUMENT.timed("command " + line.split(" ", 1)[0].lower()):
+        return _handle_command(line)
+
+def _handle_command(line: str) -> str:
+    cmd = line.lower()
+    if cmd == "/help":
+        return HELP_TEXT
+    if cmd == "/reload":
+        know = reload_knowledge()
+        return f"Reloaded knowledge ({len(know)} entries in {RELOAD_METRICS['last_duration'] * 1000:.0f} ms)."
+    if cmd == "/stats":
+        return stats_report()
+    if cmd in ("/stats on", "/stats off"):
+        INSTRUMENT.enabled = cmd.endswith("on")
+        return f"Instrumentation {'on' if INSTRUMENT.enabled else 'off'}."
+    if cmd == "/stats reset":
+        INSTRUMENT.reset()
+        return "Instrumentation counters reset."
+    if cmd == "/export_scrum":
+        return export_scrum()
+    if cmd.startswith("/add"):
+        parsed = _parse_add(line)
+        if parsed is None:
+            return "Usage: /add <question> = <answer>"
+        return add_knowledge(*parsed)
+    return "Unknown command. /help for commands."
+
 def repl():
     print("Simple local AI — type questions. /help for commands. Use /scrum to access Scrum topics.")
     while True:
@@ -251,43 +2174,480 @@ def repl():
             if cmd == "/exit":
                 print("Goodbye.")
                 break
-            if cmd == "/help":
-                print("/help    show this help\n/exit    quit\n/reload  reload knowledge.json\n/add     add Q/A to knowledge file\n/scrum   list Scrum topics or /scrum <topic>\n/export_scrum   save built-in Scrum KB to knowledge.json")
-                continue
-            if cmd == "/reload":
-                global KNOW
-                KNOW = load_knowledge()
-                print(f"Reloaded knowledge ({len(KNOW)} entries).")
-                continue
-            if cmd == "/export_scrum":
-                print(export_scrum())
-                continue
             if cmd == "/add":
-                q = input("Question (exact): ").strip().lower()
-                a = input("Answer: ").strip()
-                if q:
-                    KNOW[q] = a
-                    try:
-                        # merge with file if exists
-                        existing = {}
-                        if os.path.exists(KNOWLEDGE_FILE):
-                            with open(KNOWLEDGE_FILE, "r", encoding="utf-8") as f:
-                                existing = json.load(f) or {}
-                        existing.update({q: a})
-                        with open(KNOWLEDGE_FILE, "w", encoding="utf-8") as f:
-                            json.dump(existing, f, indent=2, ensure_ascii=False)
-                        print("Saved to knowledge.json")
-                    except Exception as e:
-                        print("Failed to save:", e)
-                else:
-                    print("Empty question, aborted.")
+                q = input("Question (exact): ")
+                a = input("Answer: ")
+                with INSTRUMENT.timed("command /add"):
+                    print(add_knowledge(q, a))
                 continue
-            print("Unknown command. /help for commands.")
+            print(handle_command(inp))
             continue
         # normal question
         ans = respond(inp)
         print(ans)
 
+# Line-protocol chat server: one prompt or slash command per line,
+# each reply is terminated by an empty line.
+async def _reload_async(lock):
+    loop = asyncio.get_running_loop()
+    async with lock:
+        # parse and index off the event loop; the swap is a single assignment
+        know = await loop.run_in_executor(None, reload_knowledge)
+    return f"Reloaded knowledge ({len(know)} entries)."
+
+async def _add_async(lock, line):
+    parsed = _parse_add(line)
+    if parsed is None or not parsed[0]:
+        return "Usage: /add <question> = <answer>"
+    loop = asyncio.get_running_loop()
+    async with lock:
+        # in-memory update on the loop thread so readers never see a partial index
+        remember(*parsed)
+        return await loop.run_in_executor(None, save_entry, *parsed)
+
+async def _serve_client(reader, writer, lock):
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            line = raw.decode("utf-8", "replace").strip()
+            if not line:
+                continue
+            cmd = line.lower()
+            if cmd == "/exit":
+                writer.write(b"Goodbye.\n\n")
+                break
+            if cmd == "/reload":
+                reply = await _reload_async(lock)
+            elif cmd.startswith("/add"):
+                reply = await _add_async(lock, line)
+            elif cmd == "/export_scrum":
+                async with lock:
+                    reply = await asyncio.get_running_loop().run_in_executor(None, export_scrum)
+            elif line.startswith("/"):
+                reply = handle_command(line)
+            else:
+                reply = respond(line)
+            writer.write(reply.encode("utf-8") + b"\n\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host="127.0.0.1", port=8765):
+    lock = asyncio.Lock()
+    server = await asyncio.start_server(
+        lambda r, w: _serve_client(r, w, lock), host, port, backlog=4096)
+    print(f"Serving on {host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def _answer_lines(lines):
+    """
+    Answer (line number, text) pairs; returns (output lines, rejected count).
+    A line that cannot be answered gets an {"error": ...} record instead of stopping the run.
+    """
+    out = []
+    errors = 0
+    for lineno, line in lines:
+        try:
+            rec = json.loads(line.strip())
+        except json.JSONDecodeError as e:
+            rec = {"error": f"line {lineno}: invalid JSON ({e.msg} at column {e.colno})"}
+        else:
+            if not isinstance(rec, dict):
+                rec = {"prompt": rec}
+            prompt = rec.get("prompt")
+            if not isinstance(prompt, str):
+                rec["error"] = f"line {lineno}: prompt must be a string"
+            else:
+                try:
+                    rec["response"] = respond(prompt)
+                except Exception as e:
+                    rec["error"] = f"line {lineno}: {type(e).__name__}: {e}"
+        errors += "error" in rec
+        out.append(json.dumps(rec, ensure_ascii=False) + "\n")
+    return out, errors
+
+def _read_chunks(f, chunk_size):
+    chunk = []
+    for lineno, line in enumerate(f, 1):
+        if line.strip():
+            chunk.append((lineno, line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def run_batch(in_path, out_path, workers=None, chunk_size=256, max_inflight=None):
+    """
+    Answer a JSONL file of prompts and write one JSON line per prompt, in input order.
+    Each input line is {"prompt": ...} (other fields are passed through) or a bare string.
+    Lines that are not valid JSON or lack a string prompt are written as {"error": ...}
+    records naming the input line, and the run continues.
+    Chunks are fanned out over a process pool with at most max_inflight chunks pending;
+    workers=0 answers in this process.
+    Returns (prompts answered, lines rejected, seconds elapsed).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    max_inflight = max_inflight or max(2, workers * 2)
+    count = rejected = 0
+    t0 = time.perf_counter()
+    with open(in_path, "r", encoding="utf-8") as fin, \
+            (nullcontext(sys.stdout) if out_path == "-" else open(out_path, "w", encoding="utf-8")) as fout:
+        def write(result):
+            nonlocal count, rejected
+            lines, errors = result
+            fout.writelines(lines)
+            count += len(lines) - errors
+            rejected += errors
+
+        chunks = _read_chunks(fin, chunk_size)
+        if workers <= 0:
+            for chunk in chunks:
+                write(_answer_lines(chunk))
+        else:
+            len(KB_INDEX)  # index once here, so forked workers share it rather than each building it
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_answer_lines, chunk))
+                    if len(pending) >= max_inflight:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    return count, rejected, time.perf_counter() - t0
+
+def _synthetic_kb(size: int, seed: int = 0, zipf: float = 0.0):
+    """
+    Random Q/A pairs over a vocabulary that grows with size. Words are drawn uniformly,
+    or with zipf > 0 by rank ** -zipf like natural text, so a few words are in most entries.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = sorted({"".join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(max(1000, size // 5))})
+    cum = None
+    if zipf:
+        rng.shuffle(vocab)
+        cum = list(itertools.accumulate(1 / rank ** zipf for rank in range(1, len(vocab) + 1)))
+    kb = {}
+    while len(kb) < size:
+        key = " ".join(rng.choices(vocab, cum_weights=cum, k=rng.randint(3, 6)))
+        kb[key] = " ".join(rng.choices(vocab, cum_weights=cum, k=20))
+    return kb
+
+def bench_index(sizes=(1000, 10000, 100000), queries=500):
+    """
+    Print index build time and best_match latency for synthetic KBs of growing size,
+    with uniform and Zipf-distributed (skewed, natural-text-like) word frequencies.
+    """
+    print(f"{'words':>8} {'entries':>8} {'build s':>8} {'avg ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, zipf in (("uniform", 0.0), ("zipf", 1.0)):
+        for size in sizes:
+            kb = _synthetic_kb(size, zipf=zipf)
+            t0 = time.perf_counter()
+            index = build_index(kb)
+            index.prepare()
+            build = time.perf_counter() - t0
+            sample = random.Random(1).sample(list(kb), min(queries, size))
+            lat = []
+            for q in sample:
+                t0 = time.perf_counter()
+                index.best_match(q, "kb")
+                lat.append(time.perf_counter() - t0)
+            lat.sort()
+            avg = sum(lat) / len(lat) * 1000
+            p50 = lat[len(lat) // 2] * 1000
+            p99 = lat[int(len(lat) * 0.99) - 1] * 1000
+            print(f"{label:>8} {size:>8} {build:>8.2f} {avg:>8.3f} {p50:>8.3f} {p99:>8.3f}")
+
+def bench_eval(n=20000):
+    """Compare cold (parse + compile) against cached evaluation of the same expressions."""
+    exprs = [f"({i} + 3) * 2 ** 5 - {i} // 7 % 3 / 1.5" for i in range(200)]
+    t0 = time.perf_counter()
+    for i in range(n):
+        compile_expr.cache_clear()
+        safe_eval(exprs[i % len(exprs)])
+    cold = (time.perf_counter() - t0) / n
+    compile_expr.cache_clear()
+    t0 = time.perf_counter()
+    for i in range(n):
+        safe_eval(exprs[i % len(exprs)])
+    cached = (time.perf_counter() - t0) / n
+    print(f"cold:   {cold * 1e6:8.2f} us/eval")
+    print(f"cached: {cached * 1e6:8.2f} us/eval ({cold / cached:.1f}x faster)")
+
+def bench_columns(rows=1_000_000, loop_rows=50_000):
+    """Compare eval_columns against calling safe_eval per row with string formatting."""
+    expr = "a * 1.2 + b ** 2 / (c + 1)"
+    rng = random.Random(0)
+    cols = {name: array.array("d", (rng.random() * 100 for _ in range(rows))) for name in "abc"}
+    t0 = time.perf_counter()
+    eval_columns(expr, cols)
+    bulk = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(loop_rows):
+        safe_eval(f"{cols['a'][i]!r} * 1.2 + {cols['b'][i]!r} ** 2 / ({cols['c'][i]!r} + 1)")
+    loop = (time.perf_counter() - t0) / loop_rows * rows
+    backend = "numpy" if np is not None else "array.array"
+    print(f"eval_columns ({backend}): {bulk:.3f}s for {rows:,} rows ({rows / bulk:,.0f} rows/sec)")
+    print(f"safe_eval loop (extrapolated): {loop:.3f}s ({loop / bulk:.0f}x slower)")
+
+def _measure_load(path, lookups):
+    import resource
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    know = load_knowledge(path)
+    _install_knowledge(know, build_index(know, path))
+    opened = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for key in lookups:
+        know[key]
+    lookup = (time.perf_counter() - t0) / len(lookups)
+    # startup as in main(): the first prompt is asked while the index warms up
+    t0 = time.perf_counter()
+    warmup = start_index_warmup(path)
+    respond(f"what is {lookups[0]}")
+    first = time.perf_counter() - t0
+    warmup.join()
+    ready = time.perf_counter() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    return opened, lookup, first, ready, rss
+
+def bench_store(size=200000):
+    """
+    Compare JSON vs memory-mapped loading: cold start (load plus build_index), lookup
+    latency, the first prompt during index warm-up, time until the full index is
+    ready, and RSS growth.
+    """
+    import tempfile
+    kb = _synthetic_kb(size)
+    lookups = random.Random(2).sample(list(kb), 1000)
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(kb, f)
+        with ctx.Pool(1) as pool:
+            json_stats = pool.apply(_measure_load, (path, lookups))
+        convert_knowledge(path)
+        with ctx.Pool(1) as pool:
+            kbx_stats = pool.apply(_measure_load, (path, lookups))
+    print(f"{size:,} entries")
+    print(f"{'format':>6} {'open ms':>9} {'lookup us':>10} {'first prompt ms':>16} {'ready s':>8} {'RSS +MB':>8}")
+    for name, (opened, lookup, first, ready, rss) in (("json", json_stats), ("kbx", kbx_stats)):
+        print(f"{name:>6} {opened * 1000:>9.2f} {lookup * 1e6:>10.2f} {first * 1000:>16.1f}"
+              f" {ready:>8.2f} {rss / 1024:>8.1f}")
+
+def _measure_shards(path, workers, stream):
+    import resource
+    global STREAM_THRESHOLD
+    STREAM_THRESHOLD = 0 if stream else float("inf")
+    if "fork" in multiprocessing.get_all_start_methods():
+        # this child was spawned; measure the forked pool load_shards uses at startup
+        multiprocessing.set_start_method("fork", force=True)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    n = len(load_shards(path, workers))
+    elapsed = time.perf_counter() - t0
+    return n, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+
+def bench_shards(size=400000, shards=8):
+    """Compare loading a sharded knowledge directory serially, in parallel, and streamed."""
+    import tempfile
+    kb = _synthetic_kb(size)
+    keys = list(kb)
+    step = -(-size // shards)
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge")
+        os.mkdir(path)
+        for i in range(shards):
+            with open(os.path.join(path, f"{i:03d}.json"), "w", encoding="utf-8") as f:
+                json.dump({k: kb[k] for k in keys[i * step:(i + 1) * step]}, f)
+        del kb, keys
+        rows = []
+        parallel = min(shards, os.cpu_count() or 1)
+        for label, workers, stream in (("serial", 1, False), ("serial stream", 1, True),
+                                       ("parallel", parallel, False), ("parallel stream", parallel, True)):
+            # a fresh non-daemonic process per run, so RSS is isolated and it may fan out
+            with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                rows.append((label,) + pool.submit(_measure_shards, path, workers, stream).result())
+    print(f"{size:,} entries in {shards} shards, {os.cpu_count()} CPUs")
+    print(f"{'mode':>16} {'entries':>9} {'load ms':>9} {'RSS +MB':>8}")
+    for label, n, elapsed, rss in rows:
+        print(f"{label:>16} {n:>9,} {elapsed * 1000:>9.1f} {rss / 1024:>8.1f}")
+
+def _typo(word: str, rng) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def bench_fuzzy(sizes=(1000, 10000, 100000), queries=300):
+    """Typo-tolerant key lookup: latency and recall for keys with one transposition."""
+    print(f"{'keys':>8} {'avg ms':>8} {'p99 ms':>8} {'recall':>7}")
+    for size in sizes:
+        kb = _synthetic_kb(size)
+        index = build_index(kb)
+        rng = random.Random(3)
+        sample = rng.sample(list(kb), min(queries, size))
+        lat, hits = [], 0
+        for key in sample:
+            q = " ".join(_typo(w, rng) if i == 0 else w for i, w in enumerate(key.split()))
+            t0 = time.perf_counter()
+            hit = index.fuzzy_match(q, "kb")
+            lat.append(time.perf_counter() - t0)
+            hits += bool(hit and hit[1] == key)
+        lat.sort()
+        print(f"{size:>8} {sum(lat) / len(lat) * 1000:>8.3f} {lat[int(len(lat) * 0.99) - 1] * 1000:>8.3f}"
+              f" {hits / len(sample):>7.1%}")
+
+def bench_router(counts=(0, 100, 500), rounds=2000):
+    """Dispatch cost as custom intents are added, against a linear if-cascade of the same checks."""
+    prompts = ["what is velocity", "sprint review", "hello there", "12 * (3 + 4)",
+               "define burndown", "how do we estimate", "what time is it"]
+    print(f"{'intents':>8} {'router us':>10} {'cascade us':>11}")
+    for n in counts:
+        router = build_default_router()
+        # odd intents filter on a phrase, even ones on a first token
+        phrases = [f"custom phrase {i}" if i % 2 else f"cmd{i}" for i in range(n)]
+        for i, phrase in enumerate(phrases):
+            if i % 2:
+                router.register(f"custom{i}", lambda query: None, 15, phrases=(phrase,))
+            else:
+                router.register(f"custom{i}", lambda query: None, 15, first_tokens=(phrase,))
+        t0 = time.perf_counter()
+        for r in range(rounds):
+            router.dispatch(prompts[r % len(prompts)])
+        routed = (time.perf_counter() - t0) / rounds
+        baseline = build_default_router()
+        t0 = time.perf_counter()
+        for r in range(rounds):
+            low = prompts[r % len(prompts)]
+            for i, phrase in enumerate(phrases):
+                if (phrase in low) if i % 2 else low.startswith(phrase):
+                    break
+            baseline.dispatch(low)
+        cascade = (time.perf_counter() - t0) / rounds
+        print(f"{n:>8} {routed * 1e6:>10.1f} {cascade * 1e6:>11.1f}")
+
+def bench_semantic(size=100000, queries=300):
+    """Build, persist, reload and query a TF-IDF index over a synthetic KB, then /add to it."""
+    import tempfile
+    kb = _synthetic_kb(size)
+    t0 = time.perf_counter()
+    vectors = VectorIndex().build(("kb", k, v) for k, v in kb.items())
+    build = time.perf_counter() - t0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.tfidf")
+        t0 = time.perf_counter()
+        vectors.save(path, None)
+        save = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vectors = VectorIndex.load(path)
+        load = time.perf_counter() - t0
+    rng = random.Random(4)
+    keys = rng.sample(list(kb), queries)
+    lat, hits = [], 0
+    for key in keys:
+        words = key.split()
+        q = " ".join(words[:-1] + kb[key].split()[:3])  # partial key plus answer words
+        t0 = time.perf_counter()
+        top = vectors.search(q, k=5)
+        lat.append(time.perf_counter() - t0)
+        hits += any(h[2] == key for h in top)
+    lat.sort()
+    # search -> add -> search, as /add after a semantic answer does
+    t0 = time.perf_counter()
+    vectors.add("kb", "zebra quokka lemur", "an entry added after searching")
+    added = time.perf_counter() - t0
+    found = any(h[2] == "zebra quokka lemur" for h in vectors.search("quokka lemur", k=5))
+    backend = "numpy" if np is not None else "pure Python"
+    print(f"{size:,} entries ({backend}): build {build:.2f}s, save {save:.2f}s, load {load:.2f}s")
+    print(f"query avg {sum(lat) / len(lat) * 1000:.2f} ms, p99 {lat[int(len(lat) * 0.99) - 1] * 1000:.2f} ms,"
+          f" recall@5 {hits / len(keys):.1%}")
+    print(f"add after search {added * 1000:.2f} ms, found by the next search: {'yes' if found else 'NO'}")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Simple local AI chatbot")
+    parser.add_argument("--bench", choices=["index", "eval", "columns", "store", "fuzzy", "router", "semantic", "shards"], help="run a micro-benchmark and exit")
+    parser.add_argument("--batch", metavar="IN.jsonl", help="answer a JSONL file of prompts and exit")
+    parser.add_argument("--out", default="-", help="output JSONL for --batch (default stdout)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --batch (default CPU count, 0 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="prompts per worker task for --batch")
+    parser.add_argument("--serve", metavar="[HOST:]PORT", help="run the line-protocol chat server")
+    parser.add_argument("--no-watch", action="store_true",
+                        help="do not reload knowledge automatically when the files change")
+    parser.add_argument("--stats-file", help="periodically write instrumentation stats to this JSON file")
+    parser.add_argument("--stats-interval", type=float, default=60.0, help="seconds between --stats-file dumps")
+    parser.add_argument("--no-stats", action="store_true", help="disable per-branch instrumentation")
+    parser.add_argument("--compact", action="store_true", help="fold the knowledge journal into knowledge.json and exit")
+    parser.add_argument("--convert", action="store_true",
+                        help="build the memory-mapped knowledge.kbx store from knowledge.json and exit")
+    args = parser.parse_args()
+    if args.bench == "index":
+        bench_index()
+        return
+    if args.bench == "eval":
+        bench_eval()
+        return
+    if args.bench == "columns":
+        bench_columns()
+        return
+    if args.bench == "store":
+        bench_store()
+        return
+    if args.bench == "fuzzy":
+        bench_fuzzy()
+        return
+    if args.bench == "router":
+        bench_router()
+        return
+    if args.bench == "semantic":
+        bench_semantic()
+        return
+    if args.bench == "shards":
+        bench_shards()
+        return
+    if args.convert:
+        print(f"Wrote {store_path()} ({convert_knowledge()} entries).")
+        return
+    if args.compact:
+        print(f"Compacted {KNOWLEDGE_FILE} ({compact_knowledge()} entries).")
+        return
+    if args.batch:
+        count, rejected, elapsed = run_batch(args.batch, args.out, args.workers, args.chunk_size)
+        rate = count / elapsed if elapsed else 0.0
+        print(f"Answered {count} prompts in {elapsed:.2f}s ({rate:,.0f} prompts/sec)"
+              + (f", {rejected} lines rejected" if rejected else ""), file=sys.stderr)
+        return
+    INSTRUMENT.enabled = not args.no_stats
+    dumper = None
+    if args.stats_file:
+        dumper = StatsDumper(args.stats_file, args.stats_interval)
+        dumper.start()
+    if not args.no_watch:
+        KnowledgeWatcher().start()
+    # index the KB, order long postings and load the semantic index before questions need them
+    start_index_warmup()
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        try:
+            asyncio.run(serve(host or "127.0.0.1", int(port)))
+        except KeyboardInterrupt:
+            pass
+    else:
+        repl()
+    if dumper is not None:
+        dumper.dump()
+
 if __name__ == "__main__":
-    repl()
+    main()
 # ...existing code...
\ No newline at end of file
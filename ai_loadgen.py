@@ -0,0 +1,69 @@
+"""
+Load generator for the AI.py chat server.
+Opens many concurrent connections, sends prompts and reports latency and throughput.
+Run: python AI.py --serve 8765  then  python ai_loadgen.py --port 8765 -c 1000 -n 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+PROMPTS = [
+    "what is velocity",
+    "/scrum events",
+    "tell me about the sprint review",
+    "hello",
+    "what time is it",
+    "12 * (3 + 4)",
+    "define burndown",
+    "how do we do backlog refinement",
+]
+
+async def client(host, port, n, latencies, errors):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errors.append(1)
+        return
+    try:
+        for _ in range(n):
+            prompt = random.choice(PROMPTS)
+            t0 = time.perf_counter()
+            writer.write(prompt.encode("utf-8") + b"\n")
+            await writer.drain()
+            # reply ends with an empty line
+            while (await reader.readline()) not in (b"\n", b""):
+                pass
+            latencies.append(time.perf_counter() - t0)
+    except ConnectionError:
+        errors.append(1)
+    finally:
+        writer.close()
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))
+    return sorted_values[i]
+
+async def run(host, port, connections, requests):
+    latencies, errors = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests, latencies, errors) for _ in range(connections)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    print(f"connections: {connections}, requests: {len(latencies)}, errors: {len(errors)}")
+    print(f"elapsed: {elapsed:.2f}s, throughput: {len(latencies) / elapsed:,.0f} req/s")
+    print(f"p50: {percentile(latencies, 50) * 1000:.2f} ms, p99: {percentile(latencies, 99) * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI.py chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-c", "--connections", type=int, default=100, help="concurrent connections")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="requests per connection")
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.connections, args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,476 @@
+"""
+VAT calculator: split gross amounts into net and VAT.
+
+Single amount:  python calculator.py --gross 120 --rate 20
+Batch ledger:   python calculator.py --input ledger.csv --rate-column vat_rate --output out.csv
+Exact money:    add --exact [--rounding half-even] [--scope total] to either of the above
+Rate table:     add --rate-table rates.csv to take rates by country, category and date
+"""
+import bisect
+import csv
+import functools
+import sys
+import time
+from array import array
+from contextlib import nullcontext
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+try:
+    import numpy as np
+except ImportError:  # optional: batch mode falls back to a plain loop
+    np = None
+
+def normalize_rate(vat_rate: float) -> float:
+    """Rates above 1 are percents (20 -> 0.2); others are already decimals."""
+    return vat_rate / 100.0 if vat_rate > 1 else vat_rate
+
 def calculate_from_gross(gross: float, vat_rate: float):
     """
     Compute net amount and VAT from a gross amount.
     vat_rate can be provided as a percent (e.g. 20) or decimal (e.g. 0.2).
     Returns (net, vat).
     """
-    if vat_rate > 1:
-        rate = vat_rate / 100.0
-    else:
-        rate = vat_rate
+    rate = normalize_rate(vat_rate)
     if rate < 0 or gross < 0:
         raise ValueError("Gross and VAT rate must be non-negative")
     net = gross / (1 + rate) if (1 + rate) != 0 else gross
     vat = gross - net
     return net, vat
 
+def calculate_columns(gross, rates):
+    """
+    Vectorized calculate_from_gross over columns of amounts.
+    rates is a column of the same length or a single rate for every row.
+    Returns (net, vat) as NumPy arrays when NumPy is installed, else array('d').
+    """
+    if np is not None:
+        r = np.asarray(rates, dtype=np.float64)
+        r = np.where(r > 1, r / 100.0, r)
+        if (r < 0).any():
+            raise ValueError("Gross and VAT rate must be non-negative")
+        return split_by_divisors(gross, 1 + r)
+    if isinstance(rates, (int, float)):
+        rates = [rates] * len(gross)
+    rates = [r / 100.0 if r > 1 else r for r in rates]
+    if rates and min(rates) < 0:
+        raise ValueError("Gross and VAT rate must be non-negative")
+    return split_by_divisors(gross, [1 + r for r in rates])
+
+def split_by_divisors(gross, divisors):
+    """(net, vat) columns for precomputed divisors (1 + decimal rate), e.g. from a RateTable."""
+    if np is not None:
+        g = np.asarray(gross, dtype=np.float64)
+        if (g < 0).any():
+            raise ValueError("Gross and VAT rate must be non-negative")
+        net = g / np.asarray(divisors, dtype=np.float64)
+        return net, g - net
+    if gross and min(gross) < 0:
+        raise ValueError("Gross and VAT rate must be non-negative")
+    net = array("d", [g / d for g, d in zip(gross, divisors)])
+    return net, array("d", [g - n for g, n in zip(gross, net)])
+
+# Exact money mode: amounts are integer cents and rates integer parts-per-million, so
+# net = gross * PPM / (PPM + rate) is an integer division rounded by an explicit policy
+# and VAT = gross - net always reconciles to the cent. Columns use int64 arithmetic
+# (exact while gross stays below MAX_EXACT_CENTS) instead of one Decimal per row.
+PPM = 1000000
+MAX_EXACT_CENTS = (2 ** 63 - 1) // (2 * PPM)
+MAX_EXPONENT = 40  # for '1e16'-style amounts; 1e40 is already far past MAX_EXACT_CENTS
+ROUNDING = ("half-up", "half-even")
+SCOPES = ("line", "total")
+
+def _div_round(num: int, den: int, rounding="half-up") -> int:
+    """Round num / den (non-negative integers) to an integer by the rounding policy."""
+    q, r = divmod(num, den)
+    if 2 * r > den or (2 * r == den and (rounding == "half-up" or q & 1)):
+        q += 1
+    return q
+
+def parse_cents(text, rounding="half-up") -> int:
+    """Parse a decimal amount ('120', '19.99', '0.125', '1e16') to integer cents without floats."""
+    s = str(text).strip()
+    sign = -1 if s.startswith("-") else 1
+    whole, _, frac = (s[1:] if s[:1] in "+-" else s).partition(".")
+    if not (whole + frac).isdigit():
+        if "e" in s.lower():  # exponent notation: expand it exactly, then parse as usual
+            try:
+                d = Decimal(s)
+            except InvalidOperation:
+                d = None
+            if d is not None and d.is_finite():
+                # bound the exponent first: format() would spell out all of '1e300000000'
+                if abs(d.as_tuple().exponent) > MAX_EXPONENT:
+                    raise ValueError(f"amount out of range: {text!r}")
+                return parse_cents(format(d, "f"), rounding)
+        raise ValueError(f"invalid amount: {text!r}")
+    if len(frac) <= 2:
+        return sign * (int(whole or "0") * 100 + int(frac.ljust(2, "0")))
+    return sign * _div_round(int(whole + frac), 10 ** (len(frac) - 2), rounding)
+
+def format_cents(cents: int) -> str:
+    return f"{'-' if cents < 0 else ''}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+@functools.lru_cache(maxsize=1024)
+def rate_ppm(vat_rate) -> int:
+    """Exact rate in parts per million; percents (> 1) are scaled like normalize_rate."""
+    try:
+        d = Decimal(str(vat_rate).strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid VAT rate: {vat_rate!r}") from None
+    if d > 1:
+        d /= 100
+    ppm = d * PPM
+    if d < 0 or ppm != ppm.to_integral_value():
+        raise ValueError(f"VAT rate must be non-negative with at most 4 decimals of a percent: {vat_rate!r}")
+    return int(ppm)
+
+def split_cents(gross_cents: int, ppm: int, rounding="half-up"):
+    """Exact (net, vat) in cents for one line."""
+    if gross_cents < 0:
+        raise ValueError("Gross and VAT rate must be non-negative")
+    net = _div_round(gross_cents * PPM, PPM + ppm, rounding)
+    return net, gross_cents - net
+
+def split_cents_columns(gross_cents, ppms, rounding="half-up"):
+    """
+    Exact column version of split_cents. ppms is a column or a single rate.
+    Uses NumPy int64 when available and every amount is below MAX_EXACT_CENTS.
+    """
+    if rounding not in ROUNDING:
+        raise ValueError(f"rounding must be one of {ROUNDING}")
+    if np is not None:
+        g = np.asarray(gross_cents, dtype=np.int64)
+        p = np.asarray(ppms, dtype=np.int64)
+        if g.size and (g.min() < 0 or p.min() < 0):
+            raise ValueError("Gross and VAT rate must be non-negative")
+        if not g.size or g.max() <= MAX_EXACT_CENTS:
+            num = g * PPM
+            den = PPM + p
+            q, r = np.divmod(num, den)
+            up = 2 * r > den
+            tie = 2 * r == den
+            q += up | (tie if rounding == "half-up" else tie & (q & 1 == 1))
+            return q, g - q
+    if isinstance(ppms, int):
+        ppms = [ppms] * len(gross_cents)
+    net, vat = [], []
+    for g, p in zip(gross_cents, ppms):
+        n, v = split_cents(g, p, rounding)
+        net.append(n)
+        vat.append(v)
+    return net, vat
+
+class RateTable:
+    """
+    VAT rates by (country, category) with effective dates, loaded once.
+    Every rate gets an integer id with its decimal rate, divisor (1 + rate) and exact
+    ppm precomputed, so batch rows only resolve an id: a dict hit on (country,
+    category, date), else a bisect over that key's sorted effective dates.
+    """
+    DEFAULT_CATEGORY = "standard"
+
+    def __init__(self, entries=()):
+        self.rates = []
+        self.divisors = array("d")
+        self.ppms = []
+        self._index = {}  # (COUNTRY, category) -> (sorted effective dates, rate ids)
+        self._memo = {}
+        groups = {}
+        for country, category, rate, effective in entries:
+            effective = date.fromisoformat(effective.strip()).isoformat()
+            groups.setdefault(self._key(country, category), []).append((effective, rate))
+        for key, items in groups.items():
+            items.sort(key=lambda item: item[0])
+            starts, ids = [], []
+            for effective, rate in items:
+                if starts and starts[-1] == effective:
+                    raise ValueError(f"duplicate VAT rate for {key[0]}/{key[1]} from {effective}")
+                decimal_rate = normalize_rate(float(rate))
+                starts.append(effective)
+                ids.append(len(self.rates))
+                self.rates.append(decimal_rate)
+                self.divisors.append(1 + decimal_rate)
+                self.ppms.append(rate_ppm(rate))
+            self._index[key] = (starts, ids)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load a table with columns country, category, rate, effective_from (ISO date)."""
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            try:
+                return cls([(row["country"], row.get("category") or "", row["rate"], row["effective_from"])
+                            for row in reader])
+            except KeyError as e:
+                raise ValueError(f"{path} is missing column {e}") from None
+
+    @classmethod
+    def _key(cls, country, category):
+        return country.strip().upper(), category.strip().lower() or cls.DEFAULT_CATEGORY
+
+    def rate_id(self, country: str, category: str, on: str) -> int:
+        """Id of the rate in force for country/category on an ISO date (or timestamp)."""
+        memo_key = (country, category, on)
+        rid = self._memo.get(memo_key)
+        if rid is not None:
+            return rid
+        # effective dates compare as YYYY-MM-DD strings, so anything else must not get that far
+        try:
+            day = datetime.fromisoformat(on.strip()).date().isoformat()
+        except ValueError:
+            raise ValueError(f"invalid date {on!r}: expected an ISO date such as 2024-09-01") from None
+        key = self._key(country, category)
+        found = self._index.get(key)
+        i = bisect.bisect_right(found[0], day) - 1 if found else -1
+        if i < 0:
+            raise ValueError(f"no VAT rate for {key[0]}/{key[1]} on {on}")
+        if len(self._memo) >= 65536:
+            self._memo.clear()
+        rid = self._memo[memo_key] = found[1][i]
+        return rid
+
+    def lookup(self, country: str, category: str, on: str) -> float:
+        return self.rates[self.rate_id(country, category, on)]
+
+def _as_list(column):
+    return column.tolist() if hasattr(column, "tolist") else column
+
+def _read_chunks(reader, size):
+    """Yield (rows, line numbers) of up to size non-blank rows."""
+    while True:
+        chunk, lines = [], []
+        add_row, add_line = chunk.append, lines.append
+        for row in reader:
+            if row:  # csv.reader yields [] for a blank line
+                add_row(row)
+                add_line(reader.line_num)
+                if len(chunk) == size:
+                    break
+        if not chunk:
+            return
+        yield chunk, lines
+
+def process_csv(in_path, out_path="-", gross_column="gross", rate_column=None,
+                rate=20.0, chunk_size=65536, exact=False, rounding="half-up", scope="line",
+                rate_table=None, country_column="country", category_column="category",
+                date_column="date"):
+    """
+    Stream a CSV ledger, appending net and vat columns to every row.
+    Each row's rate comes from rate_table (by its country, optional category and date
+    columns) when given, else from rate_column, else the fixed rate.
+    Rows are processed chunk_size at a time so memory stays flat.
+
+    With exact=True amounts are integer cents rounded per line by `rounding`; scope
+    "total" instead rounds the totals once per rate, as on a VAT return.
+    Returns (rows, gross_total, net_total, vat_total); totals are cents when exact.
+    """
+    rows = 0
+    gross_total = net_total = 0
+    by_rate = {}  # ppm -> gross cents, for scope="total"
+    with open(in_path, newline="", encoding="utf-8") as fin, \
+            (nullcontext(sys.stdout) if out_path == "-" else open(out_path, "w", newline="", encoding="utf-8")) as fout:
+        reader = csv.reader(fin)
+        writer = csv.writer(fout)
+        header = next(reader, None)
+        if header is None:
+            return 0, 0, 0, 0
+        try:
+            gi = header.index(gross_column)
+            ri = header.index(rate_column) if rate_column else None
+            if rate_table is not None:
+                ci, di = header.index(country_column), header.index(date_column)
+                ki = header.index(category_column) if category_column in header else None
+        except ValueError:
+            raise ValueError(f"column not found in {in_path} header: {header}") from None
+        writer.writerow(header + ["net", "vat"])
+
+        def parse(chunk):
+            ids = None
+            if rate_table is not None:
+                rate_id = rate_table.rate_id
+                ids = [rate_id(row[ci], row[ki] if ki is not None else "", row[di]) for row in chunk]
+            if exact:
+                gross = [parse_cents(row[gi], rounding) for row in chunk]
+                if ids is not None:
+                    ppms = rate_table.ppms
+                    rates = [ppms[i] for i in ids]
+                else:
+                    rates = [rate_ppm(row[ri]) for row in chunk] if ri is not None else rate_ppm(rate)
+            else:
+                gross = [float(row[gi]) for row in chunk]
+                rates = [float(row[ri]) for row in chunk] if ri is not None else rate
+            return ids, gross, rates
+
+        for chunk, lines in _read_chunks(reader, chunk_size):
+            try:
+                ids, gross, rates = parse(chunk)
+            except (ValueError, IndexError):
+                # the column passes stop at the first bad row; find it and report its line
+                for row, line in zip(chunk, lines):
+                    try:
+                        parse([row])
+                    except (ValueError, IndexError) as e:
+                        raise ValueError(f"bad amount or rate on line {line} of {in_path}: {e}") from None
+                raise
+            if exact:
+                net, vat = map(_as_list, split_cents_columns(gross, rates, rounding))
+                writer.writerows(row + [format_cents(n), format_cents(v)]
+                                 for row, n, v in zip(chunk, net, vat))
+                if scope == "total":
+                    for g, p in zip(gross, rates if isinstance(rates, list) else [rates] * len(gross)):
+                        by_rate[p] = by_rate.get(p, 0) + g
+            else:
+                if ids is not None:
+                    divisors = rate_table.divisors
+                    net, vat = map(_as_list, split_by_divisors(gross, [divisors[i] for i in ids]))
+                else:
+                    net, vat = map(_as_list, calculate_columns(gross, rates))
+                writer.writerows(row + [f"{n:.2f}", f"{v:.2f}"] for row, n, v in zip(chunk, net, vat))
+            net_total += sum(net)
+            gross_total += sum(gross)
+            rows += len(chunk)
+    if exact and scope == "total":
+        net_total = sum(split_cents(g, p, rounding)[0] for p, g in by_rate.items())
+    return rows, gross_total, net_total, gross_total - net_total
+
+def bench(rows=1000000):
+    """
+    Rows/sec of the scalar loop versus calculate_columns, of the exact cents path, and
+    of CSV round trips; also the float drift of the ledger's total net against exact cents.
+    """
+    import os
+    import random
+    import tempfile
+    rng = random.Random(0)
+    cents = [rng.randrange(0, 1000000) for _ in range(rows)]
+    gross = [c / 100 for c in cents]
+    rates = [rng.choice((0, 5, 10, 20, 0.21, 25)) for _ in range(rows)]
+    ppms = [rate_ppm(r) for r in rates]
+    results = []
+    t0 = time.perf_counter()
+    for g, r in zip(gross, rates):
+        calculate_from_gross(g, r)
+    results.append(("scalar loop", time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    float_net, _ = calculate_columns(gross, rates)
+    results.append(("numpy columns" if np is not None else "columns (no numpy)", time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    for c, r in zip(gross, rates):
+        g = Decimal(str(c))
+        (g / (1 + Decimal(str(normalize_rate(r))))).quantize(Decimal("0.01"))
+    results.append(("Decimal per row", time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    exact_net, _ = split_cents_columns(cents, ppms)
+    results.append(("exact cents columns", time.perf_counter() - t0))
+    table = RateTable([(c, cat, r, f"{y}-01-01") for c in ("DE", "FR", "GB", "IE", "NL", "SE")
+                       for cat, r in (("", 20), ("reduced", 5)) for y in (2019, 2021, 2023)])
+    keys = [(rng.choice(("de", "FR", "GB", "ie", "NL", "SE")), rng.choice(("", "reduced")),
+             f"202{rng.randrange(5)}-0{rng.randrange(1, 10)}-1{rng.randrange(10)}") for _ in range(rows)]
+    t0 = time.perf_counter()
+    rate_id, divisors = table.rate_id, table.divisors
+    split_by_divisors(gross, [divisors[rate_id(*k)] for k in keys])
+    results.append(("rate table columns", time.perf_counter() - t0))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["id", "gross", "rate"])
+            w.writerows(zip(range(rows), map(format_cents, cents), rates))
+        for name, exact in (("csv float", False), ("csv exact", True)):
+            t0 = time.perf_counter()
+            process_csv(path, os.path.join(tmp, "out.csv"), rate_column="rate", exact=exact)
+            results.append((name, time.perf_counter() - t0))
+    print(f"{rows:,} rows")
+    for name, elapsed in results:
+        print(f"{name:>20} {rows / elapsed:>14,.0f} rows/s")
+    float_total = sum(round(n, 2) for n in _as_list(float_net))
+    exact_total = sum(_as_list(exact_net))
+    print(f"total net: exact half-up {format_cents(exact_total)}, float round() {float_total:.6f} "
+          f"(drift {float_total - exact_total / 100:+.6f})")
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Calculate VAT and net amount from gross amount")
-    parser.add_argument("-g", "--gross", type=float, help="Gross amount (including VAT)")
+    parser.add_argument("-g", "--gross", help="Gross amount (including VAT)")
     parser.add_argument("-r", "--rate", type=float, default=20.0,
                         help="VAT rate as percent (e.g. 20) or decimal (e.g. 0.2). Default 20")
+    parser.add_argument("-i", "--input", help="CSV ledger to process in batch")
+    parser.add_argument("-o", "--output", default="-", help="batch output CSV ('-' for stdout)")
+    parser.add_argument("--gross-column", default="gross", help="CSV column holding gross amounts")
+    parser.add_argument("--rate-column", help="CSV column holding per-row rates (default: --rate)")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="rows per batch chunk")
+    parser.add_argument("--rate-table", help="CSV of country,category,rate,effective_from rates")
+    parser.add_argument("--country", help="with --rate-table: country of a single --gross amount")
+    parser.add_argument("--category", default="", help="with --rate-table: rate category (default standard)")
+    parser.add_argument("--date", default=date.today().isoformat(), help="with --rate-table: date (default today)")
+    parser.add_argument("--country-column", default="country", help="ledger column with the country code")
+    parser.add_argument("--category-column", default="category", help="ledger column with the rate category")
+    parser.add_argument("--date-column", default="date", help="ledger column with the ISO invoice date")
+    parser.add_argument("--exact", action="store_true", help="exact integer-cent arithmetic")
+    parser.add_argument("--rounding", choices=ROUNDING, default="half-up",
+                        help="exact mode rounding: half-up or half-even (banker's)")
+    parser.add_argument("--scope", choices=SCOPES, default="line",
+                        help="exact mode totals: sum of rounded lines, or rounded once per rate")
+    parser.add_argument("--bench", action="store_true", help="benchmark batch throughput and exit")
     args = parser.parse_args()
 
+    if args.bench:
+        bench()
+        return
+    table = None
+    ppm = None  # exact rate from the table, not re-derived from its float
+    if args.rate_table:
+        try:
+            table = RateTable.from_csv(args.rate_table)
+            if args.country:
+                rid = table.rate_id(args.country, args.category, args.date)
+                args.rate, ppm = table.rates[rid], table.ppms[rid]
+        except (OSError, ValueError) as e:
+            print("Error:", e, file=sys.stderr); sys.exit(1)
+    if args.input:
+        try:
+            rows, gross, net, vat = process_csv(args.input, args.output, args.gross_column, args.rate_column,
+                                                args.rate, args.chunk_size, args.exact, args.rounding, args.scope,
+                                                table, args.country_column, args.category_column,
+                                                args.date_column)
+        except (OSError, ValueError) as e:
+            print("Error:", e, file=sys.stderr); sys.exit(1)
+        if args.exact:
+            gross, net, vat = (format_cents(c) for c in (gross, net, vat))
+        else:
+            gross, net, vat = (f"{x:,.2f}" for x in (gross, net, vat))
+        print(f"Processed {rows:,} rows: gross {gross}, net {net}, VAT {vat}", file=sys.stderr)
+        return
+
     if args.gross is None:
         try:
-            args.gross = float(input("Enter gross amount: ").strip())
+            args.gross = input("Enter gross amount: ").strip()
         except Exception:
             print("Invalid gross amount"); return
 
+    # the amount stays text in exact mode, so it is never rounded through a float
     try:
-        net, vat = calculate_from_gross(args.gross, args.rate)
+        if args.exact:
+            gross = parse_cents(args.gross, args.rounding)
+            net, vat = split_cents(gross, rate_ppm(repr(args.rate)) if ppm is None else ppm, args.rounding)
+        else:
+            try:
+                gross = float(args.gross)
+            except ValueError:
+                print("Invalid gross amount"); return
+            net, vat = calculate_from_gross(gross, args.rate)
     except ValueError as e:
         print("Error:", e); return
 
-    display_rate = args.rate / 100.0 if args.rate > 1 else args.rate
-    print(f"Gross: {args.gross:,.2f}")
-    print(f"Net:   {net:,.2f}")
-    print(f"VAT:   {vat:,.2f}")
+    if args.exact:
+        gross, net, vat = (format_cents(c) for c in (gross, net, vat))
+    else:
+        gross, net, vat = (f"{x:,.2f}" for x in (gross, net, vat))
+    display_rate = normalize_rate(args.rate)
+    print(f"Gross: {gross}")
+    print(f"Net:   {net}")
+    print(f"VAT:   {vat}")
     print(f"VAT rate: {display_rate:.2%}")
 
 if __name__ == "__main__":
@@ -1,7 +1,24 @@
 # ...existing code...
+import math
 import random
 import time
 import sys
+import os
+import copy
+import asyncio
+import signal
+import sqlite3
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import term_render
+from term_render import TerminalRenderer
+
+try:
+    import numpy as np
+except ImportError:  # optional: the simulator falls back to a per-session loop
+    np = None
 
 WHEEL = [
     ("Lose", 0.40, 0.0),      # 40% -> lose bet
@@ -13,28 +30,104 @@ WHEEL = [
 
 SPIN_CHARS = ["|", "/", "-", "\\"]
 
+class AliasSampler:
+    """
+    Weighted index sampler using Vose's alias method: O(n) setup, then every draw is one
+    uniform number, one table lookup and one comparison, whatever the number of sectors.
+    Build it once per weight configuration and reuse it.
+    """
+    def __init__(self, weights):
+        weights = [float(w) for w in weights]
+        total = sum(weights)
+        if not weights or total <= 0 or min(weights) < 0:
+            raise ValueError("weights must be non-negative with a positive sum")
+        n = self.n = len(weights)
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # whatever is left is 1 up to rounding and keeps prob 1.0 / alias to itself
+        self.prob, self.alias = prob, alias
+        if np is not None:
+            self._prob = np.array(prob)
+            self._alias = np.array(alias, dtype=np.intp)
+
+    def _scratch(self, size):
+        # work buffers reused across fill() calls of the same size
+        bufs = getattr(self, "_bufs", None)
+        if bufs is None or len(bufs[0]) != size:
+            bufs = self._bufs = (np.empty(size), np.empty(size, dtype=np.intp),
+                                 np.empty(size), np.empty(size, dtype=bool))
+        return bufs
+
+    def draw(self, rng=random) -> int:
+        """One index; rng is a random.Random-like object."""
+        u = rng.random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def fill(self, out, rng=None):
+        """
+        Fill a preallocated buffer with draws and return it. With NumPy, out is an integer
+        ndarray and rng a numpy Generator; otherwise out is a list or array('l') and rng a
+        random.Random. The NumPy path reuses scratch buffers between calls, so don't
+        fill from one sampler in several threads at once.
+        """
+        if np is not None and isinstance(out, np.ndarray):
+            rng = rng if rng is not None else np.random.default_rng()
+            u, i, p, hit = self._scratch(len(out))
+            rng.random(out=u)
+            u *= self.n
+            np.copyto(i, u, casting="unsafe")  # floor, as u >= 0
+            u -= i
+            np.take(self._prob, i, out=p, mode="clip")
+            np.less(u, p, out=hit)
+            np.take(self._alias, i, out=out, mode="clip")
+            np.copyto(out, i, where=hit, casting="unsafe")
+            return out
+        rand = (rng or random).random
+        n, prob, alias = self.n, self.prob, self.alias
+        draws = [i if (u := rand() * n) - (i := int(u)) < prob[i] else alias[i] for _ in range(len(out))]
+        out[:] = array(out.typecode, draws) if isinstance(out, array) else draws
+        return out
+
+    def sample(self, k, rng=None):
+        """k draws in a new buffer (ndarray with NumPy, else array('l'))."""
+        if np is not None:
+            return self.fill(np.empty(k, dtype=np.intp), rng)
+        return self.fill(array("l", bytes(k * array("l").itemsize)), rng)
+
+WHEEL_SAMPLER = AliasSampler([s[1] for s in WHEEL])
+
 def choose_sector():
-    labels = [s[0] for s in WHEEL]
-    weights = [s[1] for s in WHEEL]
-    return random.choices(list(range(len(WHEEL))), weights=weights, k=1)[0]
+    return WHEEL_SAMPLER.draw()
 
-def animate_spin(final_index, rounds=20, delay=0.04):
+def spin_frames(final_index, rounds=20, delay=0.04):
+    """(text, seconds) frames of a spin that slows down onto final_index."""
     length = len(WHEEL)
     pos = random.randrange(length)
     for i in range(rounds):
         pos = (pos + 1) % length
         label = WHEEL[pos][0]
-        sys.stdout.write(f"\rSpinning... {SPIN_CHARS[i % len(SPIN_CHARS)]}  [{label}] ")
-        sys.stdout.flush()
-        time.sleep(delay)
+        yield f"Spinning... {SPIN_CHARS[i % len(SPIN_CHARS)]}  [{label}] ", delay
     # slow to final
     while pos != final_index:
         pos = (pos + 1) % length
         label = WHEEL[pos][0]
-        sys.stdout.write(f"\rSpinning... {SPIN_CHARS[pos % len(SPIN_CHARS)]}  [{label}] ")
-        sys.stdout.flush()
-        time.sleep(delay * 1.8)
-    print()
+        yield f"Spinning... {SPIN_CHARS[pos % len(SPIN_CHARS)]}  [{label}] ", delay * 1.8
+
+async def animate_spin_async(final_index, renderer=None, rounds=20, delay=0.04):
+    """Spin animation on the shared frame clock; other sessions keep running meanwhile."""
+    await (renderer or TerminalRenderer()).play(spin_frames(final_index, rounds, delay))
+
+def animate_spin(final_index, rounds=20, delay=0.04):
+    term_render.run(animate_spin_async(final_index, rounds=rounds, delay=delay))
 
 def play_round(balance):
     print(f"\nBalance: ${balance:.2f}")
@@ -67,6 +160,433 @@ def play_round(balance):
     print(f"New balance: ${balance:.2f}")
     return balance
 
+# Headless simulation: each spin pays bet * (multiplier - 1), so a session is a walk
+# of the balance driven by the strategy's bet sizes. Sessions are simulated in fixed
+# chunks, each with its own RNG stream derived from (seed, chunk index), so results are
+# reproducible for a seed whatever the number of worker processes.
+SIM_CHUNK = 4096
+
+def wheel_stats(wheel=WHEEL):
+    """Exact (expected value, variance) of the net return of a 1-unit bet."""
+    ev = sum(p * (mult - 1) for _, p, mult in wheel)
+    var = sum(p * (mult - 1 - ev) ** 2 for _, p, mult in wheel)
+    return ev, var
+
+def _clip(x, lo, hi):
+    if np is not None and isinstance(x, np.ndarray):
+        return np.clip(x, lo, hi)
+    return min(max(x, lo), hi)
+
+def kelly_fraction(wheel=WHEEL) -> float:
+    """Bankroll fraction maximizing expected log growth (0 when the wheel has no edge)."""
+    outcomes = [(p, mult - 1) for _, p, mult in wheel]
+    def slope(f):
+        return sum(p * r / (1 + f * r) for p, r in outcomes)
+    if slope(0.0) <= 0:
+        return 0.0
+    worst = min(r for _, r in outcomes)
+    lo, hi = 0.0, (-1 / worst if worst < 0 else 1.0) * (1 - 1e-12)
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if slope(mid) > 0 else (lo, mid)
+    return lo
+
+class Strategy:
+    """
+    Betting rule shared by simulate() and BankrollDP. bets() maps the balance and the
+    current losing streak to the next bet; it must work elementwise on NumPy arrays and
+    on floats. Streaks count up to streak_levels - 1. A session also stops once the
+    balance is at or below stop_loss or at or above take_profit (None disables either).
+    """
+    name = "strategy"
+    streak_levels = 1
+
+    def __init__(self, stop_loss=None, take_profit=None):
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+
+    def bets(self, balance, losses):
+        raise NotImplementedError
+
+    def playing(self, balance):
+        ok = balance == balance
+        if self.stop_loss is not None:
+            ok = ok & (balance > self.stop_loss)
+        if self.take_profit is not None:
+            ok = ok & (balance < self.take_profit)
+        return ok
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v:g}" for k, v in vars(self).items() if v is not None)
+        return f"{self.name}({params})"
+
+class FlatBet(Strategy):
+    """Bet the same amount every spin."""
+    name = "flat"
+
+    def __init__(self, amount=10.0, **limits):
+        super().__init__(**limits)
+        self.amount = amount
+
+    def bets(self, balance, losses):
+        return balance * 0 + self.amount
+
+class FractionBet(Strategy):
+    """Bet a fixed fraction of the current balance."""
+    name = "fraction"
+
+    def __init__(self, fraction=0.1, **limits):
+        super().__init__(**limits)
+        self.fraction = fraction
+
+    def bets(self, balance, losses):
+        return balance * self.fraction
+
+class KellyBet(FractionBet):
+    """Bet scale times the Kelly fraction of the wheel (scale 0.5 is 'half Kelly')."""
+    name = "kelly"
+
+    def __init__(self, scale=1.0, wheel=WHEEL, **limits):
+        super().__init__(scale * kelly_fraction(wheel), **limits)
+        self.scale = scale
+
+class Martingale(Strategy):
+    """Double the bet after every loss, back to base after a win, up to a table limit."""
+    name = "martingale"
+
+    def __init__(self, base=1.0, max_doublings=10, **limits):
+        super().__init__(**limits)
+        self.base = base
+        self.max_doublings = max_doublings
+
+    @property
+    def streak_levels(self):
+        return self.max_doublings + 1
+
+    def bets(self, balance, losses):
+        return self.base * 2.0 ** losses
+
+def _sim_totals(sessions):
+    return {"sessions": sessions, "spins": 0, "sum_r": 0.0, "sum_r2": 0.0, "wagered": 0.0,
+            "net": 0.0, "ruined": 0, "final_sum": 0.0, "final_sq": 0.0}
+
+def _simulate_chunk(task):
+    """Simulate one chunk of sessions; returns summed statistics (runs in a worker)."""
+    sessions, spins, bankroll, strategy, min_bet, unit, cap, seed, index, wheel = task
+    sampler = WHEEL_SAMPLER if wheel is WHEEL else AliasSampler([p for _, p, _ in wheel])
+    returns = [mult - 1 for _, _, mult in wheel]
+    top = strategy.streak_levels - 1
+    out = _sim_totals(sessions)
+    if np is not None:
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+        returns = np.array(returns)
+        idx = np.empty(sessions, dtype=np.intp)
+        balance = np.full(sessions, float(bankroll))
+        losses = np.zeros(sessions, dtype=np.int64)
+        active = (balance >= min_bet) & strategy.playing(balance)
+        for _ in range(spins):
+            if not active.any():
+                break
+            bet = strategy.bets(balance, losses)
+            if unit:
+                bet = np.round(bet / unit) * unit
+            bet = np.where(active, _clip(bet, min_bet, balance), 0.0)
+            r = returns[sampler.fill(idx, rng)]
+            ra = r[active]
+            out["spins"] += len(ra)
+            out["sum_r"] += float(ra.sum())
+            out["sum_r2"] += float((ra * ra).sum())
+            out["wagered"] += float(bet.sum())
+            gain = bet * r
+            out["net"] += float(gain.sum())
+            balance += gain
+            if cap is not None:
+                np.minimum(balance, cap, out=balance)
+            streak = np.where(r < 0, np.minimum(losses + 1, top), np.where(r > 0, 0, losses))
+            losses = np.where(active, streak, losses)
+            active &= (balance >= min_bet) & strategy.playing(balance)
+        out["ruined"] = int((balance < min_bet).sum())
+        out["final_sum"] = float(balance.sum())
+        out["final_sq"] = float((balance * balance).sum())
+        return out
+    rng = random.Random(f"{seed}/{index}")
+    idx = array("l", bytes(spins * array("l").itemsize))
+    for _ in range(sessions):
+        balance, losses = float(bankroll), 0
+        if balance >= min_bet and strategy.playing(balance):
+            for i in sampler.fill(idx, rng):
+                bet = strategy.bets(balance, losses)
+                if unit:
+                    bet = round(bet / unit) * unit
+                bet = _clip(bet, min_bet, balance)
+                r = returns[i]
+                out["spins"] += 1
+                out["sum_r"] += r
+                out["sum_r2"] += r * r
+                out["wagered"] += bet
+                out["net"] += bet * r
+                balance += bet * r
+                if cap is not None:
+                    balance = min(balance, cap)
+                if r:
+                    losses = min(losses + 1, top) if r < 0 else 0
+                if balance < min_bet or not strategy.playing(balance):
+                    break
+        out["ruined"] += balance < min_bet
+        out["final_sum"] += balance
+        out["final_sq"] += balance * balance
+    return out
+
+def simulate(sessions=10000, spins=100, bankroll=100.0, strategy=None, min_bet=1.0,
+             seed=None, workers=None, wheel=WHEEL, unit=None, cap=None):
+    """
+    Monte Carlo sessions of up to `spins` spins starting from `bankroll`. A session is
+    ruined once the balance cannot cover min_bet. With unit, bets are rounded to
+    multiples of it, and with cap the balance is clamped there and the session ends,
+    as in BankrollDP. Returns summed statistics plus the seed.
+    """
+    strategy = strategy or FlatBet()
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+    tasks = [(min(SIM_CHUNK, sessions - start), spins, bankroll, strategy, min_bet, unit, cap, seed, i, wheel)
+             for i, start in enumerate(range(0, sessions, SIM_CHUNK))]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= 1:
+        results = list(map(_simulate_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    totals = _sim_totals(0)
+    for part in results:
+        for key, value in part.items():
+            totals[key] += value
+    totals["seed"] = seed
+    return totals
+
+def simulation_report(totals, bankroll, wheel=WHEEL) -> str:
+    ev, var = wheel_stats(wheel)
+    spins = max(totals["spins"], 1)
+    sessions = max(totals["sessions"], 1)
+    emp_ev = totals["sum_r"] / spins
+    emp_var = totals["sum_r2"] / spins - emp_ev ** 2
+    mean_final = totals["final_sum"] / sessions
+    sd_final = max(totals["final_sq"] / sessions - mean_final ** 2, 0.0) ** 0.5
+    return "\n".join([
+        f"sessions {totals['sessions']:,}, spins {totals['spins']:,}, seed {totals['seed']}",
+        f"EV per $1 bet:       {emp_ev:+.4f} (exact {ev:+.4f})",
+        f"house edge:          {-emp_ev:+.2%} (exact {-ev:+.2%})",
+        f"variance per $1 bet: {emp_var:.4f} (exact {var:.4f})",
+        f"return on wagered:   {totals['net'] / max(totals['wagered'], 1e-12):+.4f}",
+        f"ruin probability:    {totals['ruined'] / sessions:.4f}",
+        f"final balance:       mean ${mean_final:,.2f}, sd ${sd_final:,.2f} (start ${bankroll:,.2f})",
+    ])
+
+def _strategy_key(strategy):
+    """Exact memo key for a strategy (repr rounds its parameters to 6 digits, for display only)."""
+    return type(strategy), tuple(sorted(vars(strategy).items()))
+
+class BankrollDP:
+    """
+    Exact session statistics by dynamic programming over discretized bankroll states.
+    A state is (balance in whole units, losing streak). Bets round to whole units, the
+    balance is capped at `cap` (reaching it ends the session, like a take-profit) and
+    ruin means the balance can no longer cover min_bet. The state distribution is
+    propagated exactly spin by spin; transition tables are memoized per strategy and
+    distributions per (strategy, bankroll, spins), so sweeps only pay for new work.
+    """
+    def __init__(self, wheel=WHEEL, unit=1.0, cap=10000.0, min_bet=1.0):
+        total = sum(p for _, p, _ in wheel)
+        self.probs = [p / total for _, p, _ in wheel]
+        self.returns = [mult - 1 for _, _, mult in wheel]
+        self.unit = unit
+        self.top = int(round(cap / unit))
+        self.size = self.top + 1
+        self.min_units = max(1, int(-(-min_bet // unit)))
+        self._tables = {}
+        self._dists = {}
+
+    def _table(self, strategy):
+        """Per outcome, the flattened successor of every state (absorbing states map to themselves)."""
+        key = _strategy_key(strategy)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+        levels, size, top, unit = strategy.streak_levels, self.size, self.top, self.unit
+        if np is not None:
+            b = np.arange(size)
+            nexts = [np.empty(levels * size, dtype=np.intp) for _ in self.returns]
+            for level in range(levels):
+                live = (b >= self.min_units) & (b < top) & strategy.playing(b * unit)
+                bet = np.rint(strategy.bets(b * unit, level) / unit)
+                bet = np.minimum(np.maximum(bet, self.min_units), b)
+                for k, r in enumerate(self.returns):
+                    nb = np.clip(np.rint(b + bet * r), 0, top).astype(np.intp)
+                    nl = min(level + 1, levels - 1) if r < 0 else (0 if r > 0 else level)
+                    nexts[k][level * size:(level + 1) * size] = np.where(live, nl * size + nb, level * size + b)
+            table = self._tables[key] = nexts
+            return table
+        nexts = [list(range(levels * size)) for _ in self.returns]
+        for level in range(levels):
+            for b in range(self.min_units, top):
+                if not strategy.playing(b * unit):
+                    continue
+                bet = min(max(int(round(strategy.bets(b * unit, level) / unit)), self.min_units), b)
+                s = level * size + b
+                for k, r in enumerate(self.returns):
+                    nb = min(max(int(round(b + bet * r)), 0), top)
+                    nl = min(level + 1, levels - 1) if r < 0 else (0 if r > 0 else level)
+                    nexts[k][s] = nl * size + nb
+        table = self._tables[key] = nexts
+        return table
+
+    def distribution(self, strategy, bankroll, spins):
+        """
+        Exact distribution over states after `spins` spins from bankroll (streak 0), as
+        (state indices, probabilities). Only states with probability are carried, and
+        results are memoized per (strategy, bankroll) so longer horizons extend shorter ones.
+        """
+        start = min(max(int(round(bankroll / self.unit)), 0), self.top)
+        memo = self._dists.setdefault((_strategy_key(strategy), start), {})
+        if spins in memo:
+            return memo[spins]
+        done = [n for n in memo if n < spins]
+        n = max(done) if done else 0
+        states, probs = memo[n] if done else ([start], [1.0])
+        nexts = self._table(strategy)
+        if np is not None:
+            nexts, weights = np.stack(nexts), np.array(self.probs)[:, None]
+            states, probs = np.asarray(states, dtype=np.intp), np.asarray(probs)
+            for _ in range(n, spins):
+                acc = np.bincount(nexts[:, states].ravel(), (weights * probs).ravel(), minlength=nexts.shape[1])
+                states = np.flatnonzero(acc)
+                probs = acc[states]
+        else:
+            dist = dict(zip(states, probs))
+            for _ in range(n, spins):
+                acc = {}
+                for s, q in dist.items():
+                    for p, nk in zip(self.probs, nexts):
+                        t = nk[s]
+                        acc[t] = acc.get(t, 0.0) + p * q
+                dist = acc
+            states, probs = list(dist), list(dist.values())
+        memo[spins] = (states, probs)
+        return states, probs
+
+    def evaluate(self, strategy, bankroll, spins):
+        """Exact dict(ruin, capped, final): ruin and cap probabilities and expected final balance."""
+        states, probs = self.distribution(strategy, bankroll, spins)
+        ruin = capped = final = 0.0
+        for s, q in zip(_as_list(states), _as_list(probs)):
+            b = s % self.size
+            if b < self.min_units:
+                ruin += q
+            elif b == self.top:
+                capped += q
+            final += q * b * self.unit
+        return {"ruin": ruin, "capped": capped, "final": final}
+
+    def sweep(self, strategies, bankroll, spins):
+        """evaluate() every strategy; returns [(strategy, result)]."""
+        return [(s, self.evaluate(s, bankroll, spins)) for s in strategies]
+
+def cross_check(strategy, bankroll=100.0, spins=100, sessions=100000, min_bet=1.0,
+                unit=1.0, cap=10000.0, seed=None, workers=None):
+    """Compare BankrollDP with simulate() under the same discretization and cap."""
+    dp = BankrollDP(unit=unit, cap=cap, min_bet=min_bet).evaluate(strategy, bankroll, spins)
+    capped = copy.copy(strategy)
+    capped.take_profit = cap if strategy.take_profit is None else min(cap, strategy.take_profit)
+    mc = simulate(sessions, spins, bankroll, capped, min_bet, seed, workers, unit=unit, cap=cap)
+    n = mc["sessions"]
+    ruin = mc["ruined"] / n
+    mean = mc["final_sum"] / n
+    sd = max(mc["final_sq"] / n - mean ** 2, 0.0) ** 0.5
+    return "\n".join([
+        f"{strategy!r}, bankroll {bankroll:g}, {spins} spins",
+        f"{'':>16} {'DP (exact)':>14} {'Monte Carlo':>14} {'MC std err':>11}",
+        f"{'ruin':>16} {dp['ruin']:>14.5f} {ruin:>14.5f} {(ruin * (1 - ruin) / n) ** 0.5:>11.5f}",
+        f"{'final balance':>16} {dp['final']:>14.2f} {mean:>14.2f} {sd / n ** 0.5:>11.2f}",
+    ])
+
+def default_sweep(bankroll=100.0, stop_loss=None, take_profit=None):
+    """A few hundred strategy variants for --sweep."""
+    limits = {"stop_loss": stop_loss, "take_profit": take_profit}
+    strategies = [FlatBet(float(a), **limits) for a in range(1, int(bankroll) + 1)]
+    strategies += [FractionBet(f / 100, **limits) for f in range(1, 100)]
+    strategies += [KellyBet(s / 20, **limits) for s in range(1, 41)]
+    strategies += [Martingale(float(base), d, **limits) for base in (1, 2, 5, 10) for d in range(1, 11)]
+    return strategies
+
+def _as_list(column):
+    return column.tolist() if hasattr(column, "tolist") else column
+
+def chi_square(counts, weights):
+    """Pearson statistic of counts against weights and its p = 0.001 critical value."""
+    total_w, total_n = sum(weights), sum(counts)
+    stat, df = 0.0, -1
+    for c, w in zip(counts, weights):
+        if w > 0:
+            expected = total_n * w / total_w
+            stat += (c - expected) ** 2 / expected
+            df += 1
+        elif c:
+            return float("inf"), max(df, 1), 0.0
+    df = max(df, 1)
+    # Wilson-Hilferty approximation of the chi-square quantile, z(0.999) = 3.0902
+    h = 2 / (9 * df)
+    return stat, df, df * (1 - h + 3.0902 * h ** 0.5) ** 3
+
+def check_sampler(draws=1000000, seed=0) -> bool:
+    """Chi-square test of AliasSampler draws against several weight configurations."""
+    rng = random.Random(seed)
+    configs = [("wheel", [s[1] for s in WHEEL]), ("single", [1.0]), ("zeros", [0.0, 1.0, 0.0, 3.0]),
+               ("skewed", [1000.0] + [1.0] * 9), ("random", [rng.random() for _ in range(50)])]
+    ok = True
+    for name, weights in configs:
+        sampler = AliasSampler(weights)
+        counts = [0] * len(weights)
+        for i in sampler.sample(draws, np.random.default_rng(seed) if np is not None else rng):
+            counts[i] += 1
+        stat, df, critical = chi_square(counts, weights)
+        passed = stat <= critical
+        ok &= passed
+        print(f"{name:>7}: chi2 {stat:9.2f}  df {df:3d}  critical {critical:7.2f}  {'ok' if passed else 'FAIL'}")
+    return ok
+
+def bench_sampler(draws=10000000):
+    """Throughput of the old per-call random.choices, bulk random.choices and AliasSampler."""
+    weights = [s[1] for s in WHEEL]
+    results = []
+    per_call = draws // 10
+    t0 = time.perf_counter()
+    for _ in range(per_call):
+        random.choices(list(range(len(WHEEL))), weights=weights, k=1)[0]
+    results.append(("random.choices per call", per_call, time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    random.choices(range(len(WHEEL)), weights=weights, k=draws)
+    results.append(("random.choices bulk", draws, time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    for _ in range(per_call):
+        choose_sector()
+    results.append(("alias draw per call", per_call, time.perf_counter() - t0))
+    buf = array("l", bytes(draws * array("l").itemsize))
+    t0 = time.perf_counter()
+    WHEEL_SAMPLER.fill(buf, random.Random(0))
+    results.append(("alias fill (python)", draws, time.perf_counter() - t0))
+    if np is not None:
+        gen = np.random.default_rng(0)
+        p = np.array(weights) / sum(weights)
+        t0 = time.perf_counter()
+        gen.choice(len(weights), size=draws, p=p)
+        results.append(("numpy choice(p=)", draws, time.perf_counter() - t0))
+        out = np.empty(draws, dtype=np.intp)
+        t0 = time.perf_counter()
+        WHEEL_SAMPLER.fill(out, gen)
+        results.append(("alias fill (numpy)", draws, time.perf_counter() - t0))
+    for name, n, elapsed in results:
+        print(f"{name:>24} {n / elapsed:>14,.0f} draws/s")
+
 def print_help():
     print("\nCommands:")
     print("  spin   - place a bet and spin")
@@ -74,7 +594,314 @@ def print_help():
     print("  help   - show commands")
     print("  quit   - exit game\n")
 
+# Multi-session server: one asyncio process hosts every player. Balances live in memory
+# and are persisted to SQLite (WAL) by a group commit: updates made within one
+# commit_interval share a transaction, and each spin replies once its batch is durable.
+STARTING_BALANCE = 100.0
+
+class BalanceStore:
+    """
+    Player balances cached in memory and written to SQLite in batched commits.
+    Updates are only pending until their batch commits; a failed batch is rolled back
+    and leaves the committed balances as they were.
+    """
+    def __init__(self, path="casino.db", commit_interval=0.01, max_batch=5000):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.commits = 0
+        self.rows = 0
+        self.commit_times = deque(maxlen=10000)
+        self._balances = {}  # committed
+        self._pending = {}   # updated since the last flush
+        self._inflight = {}  # the batch being committed
+        self._waiters = []
+        self._db = ThreadPoolExecutor(max_workers=1)  # sqlite connection stays on one thread
+        self._conn = None
+        self._wake = None
+        self._task = None
+
+    def _run(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._db, fn, *args)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS players "
+                     "(name TEXT PRIMARY KEY, balance REAL NOT NULL, updated REAL NOT NULL)")
+        self._conn = conn
+
+    def _load(self, name):
+        row = self._conn.execute("SELECT balance FROM players WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _commit(self, rows):
+        now = time.time()
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO players (name, balance, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET balance = excluded.balance, updated = excluded.updated",
+                [(name, balance, now) for name, balance in rows])
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")  # leave the connection usable for the next batch
+            raise
+
+    async def open(self):
+        await self._run(self._connect)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._flusher())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._flush()
+        await self._run(self._conn.close)
+        self._db.shutdown()
+
+    async def login(self, name) -> float:
+        """Balance of a player, creating them with STARTING_BALANCE if new."""
+        if name not in self._balances:
+            balance = await self._run(self._load, name)
+            if name not in self._balances:  # another session may have loaded it meanwhile
+                if balance is None:
+                    balance = STARTING_BALANCE
+                    self._pending[name] = balance
+                self._balances[name] = balance
+        return self.balance(name)
+
+    def balance(self, name) -> float:
+        """Latest balance, including updates still waiting for their commit."""
+        if name in self._pending:
+            return self._pending[name]
+        if name in self._inflight:
+            return self._inflight[name]
+        return self._balances[name]
+
+    def update(self, name, balance):
+        """Queue a balance; returns a future that resolves once it is committed."""
+        self._pending[name] = balance
+        done = asyncio.get_running_loop().create_future()
+        self._waiters.append(done)
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+        return done
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        batch, waiters = self._pending, self._waiters
+        self._pending, self._waiters = {}, []
+        self._inflight = batch
+        t0 = time.perf_counter()
+        try:
+            await self._run(self._commit, list(batch.items()))
+        except Exception as e:
+            for w in waiters:
+                if not w.done():
+                    w.set_exception(e)
+            return
+        finally:
+            self._inflight = {}
+        self._balances.update(batch)
+        self.commit_times.append(time.perf_counter() - t0)
+        self.commits += 1
+        self.rows += len(batch)
+        for w in waiters:
+            if not w.done():
+                w.set_result(None)
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.commit_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self._flush()
+
+    def report(self) -> str:
+        times = sorted(self.commit_times)
+        if not times:
+            return "commits: 0"
+        p50, p99 = times[len(times) // 2], times[min(len(times) - 1, len(times) * 99 // 100)]
+        return (f"commits: {self.commits}, rows: {self.rows} ({self.rows / self.commits:.1f}/commit), "
+                f"commit p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, players: {len(self._balances)}")
+
+SERVER_HELP = ("Commands: login <name>, spin <bet>, bal, anim on|off, stats, help, quit")
+
+async def _spin(store, name, text, renderer):
+    try:
+        bet = float(text)
+    except ValueError:
+        return "Enter a numeric bet amount."
+    balance = store.balance(name)
+    if not math.isfinite(bet) or bet <= 0:
+        return "Bet must be a positive amount."
+    if bet > balance:
+        return "Insufficient balance."
+    idx = choose_sector()
+    label, _, mult = WHEEL[idx]
+    balance += bet * mult - bet
+    commit = store.update(name, balance)
+    if renderer is not None:
+        await animate_spin_async(idx, renderer)
+    try:
+        await commit
+    except sqlite3.Error:
+        return f"Spin not recorded (could not save balances). Balance: ${store.balance(name):.2f}"
+    if mult <= 0:
+        return f"Result: {label} - you lost ${bet:.2f}. Balance: ${balance:.2f}"
+    return f"Result: {label} - you win ${bet * mult:.2f} (multiplier {mult}x). Balance: ${balance:.2f}"
+
+async def _serve_player(reader, writer, store):
+    name, renderer = None, None
+    try:
+        writer.write(f"Welcome to Lucky Spin Casino. {SERVER_HELP}\n\n".encode("utf-8"))
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            cmd, _, arg = raw.decode("utf-8", "replace").strip().partition(" ")
+            cmd, arg = cmd.lower(), arg.strip()
+            if not cmd:
+                continue
+            if cmd in ("quit", "q", "exit"):
+                if name is not None:
+                    writer.write(f"Leaving casino. Final balance: ${store.balance(name):.2f}\n\n".encode("utf-8"))
+                break
+            if cmd == "login" and arg:
+                name = arg
+                reply = f"Welcome {name}. Balance: ${await store.login(name):.2f}"
+            elif cmd in ("help", "h"):
+                reply = SERVER_HELP
+            elif cmd == "stats":
+                reply = store.report()
+            elif name is None:
+                reply = "Please login <name> first."
+            elif cmd in ("bal", "balance"):
+                reply = f"Balance: ${store.balance(name):.2f}"
+            elif cmd in ("spin", "s"):
+                reply = await _spin(store, name, arg or "1", renderer)
+            elif cmd == "anim":
+                renderer = TerminalRenderer(writer, interactive=True, encoding="utf-8") if arg == "on" else None
+                reply = f"Animation {'on' if renderer else 'off'}."
+            else:
+                reply = "Unknown command. Type 'help' for options."
+            writer.write(reply.encode("utf-8") + b"\n\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host="127.0.0.1", port=8766, db="casino.db", commit_interval=0.01):
+    store = BalanceStore(db, commit_interval)
+    await store.open()
+    server = await asyncio.start_server(
+        lambda r, w: _serve_player(r, w, store), host, port, backlog=4096)
+    print(f"Serving on {host}:{port}, balances in {db}", file=sys.stderr)
+    try:
+        # SIGTERM stops serving and still flushes uncommitted balances
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, AttributeError):
+        pass
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await store.close()
+
+def _strategy_from_args(args):
+    limits = {"stop_loss": args.stop_loss, "take_profit": args.take_profit}
+    if args.strategy == "fraction":
+        return FractionBet(args.fraction, **limits)
+    if args.strategy == "kelly":
+        return KellyBet(args.kelly_scale, **limits)
+    if args.strategy == "martingale":
+        return Martingale(args.bet, args.doublings, **limits)
+    return FlatBet(args.bet, **limits)
+
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Lucky Spin Casino (demo)")
+    parser.add_argument("--simulate", action="store_true", help="run a headless Monte Carlo simulation")
+    parser.add_argument("--sessions", type=int, default=10000, help="simulated sessions")
+    parser.add_argument("--spins", type=int, default=100, help="maximum spins per session")
+    parser.add_argument("--bankroll", type=float, default=100.0, help="starting balance per session")
+    parser.add_argument("--strategy", choices=["flat", "fraction", "kelly", "martingale"], default="flat",
+                        help="betting strategy")
+    parser.add_argument("--bet", type=float, default=10.0, help="flat bet amount (martingale base bet)")
+    parser.add_argument("--fraction", type=float, default=0.1, help="bankroll fraction per bet")
+    parser.add_argument("--kelly-scale", type=float, default=1.0, help="multiple of the Kelly fraction")
+    parser.add_argument("--doublings", type=int, default=10, help="martingale table limit in doublings")
+    parser.add_argument("--stop-loss", type=float, help="stop once the balance falls to this amount")
+    parser.add_argument("--take-profit", type=float, help="stop once the balance reaches this amount")
+    parser.add_argument("--dp", action="store_true",
+                        help="exact dynamic-programming analysis, cross-checked by simulation")
+    parser.add_argument("--sweep", action="store_true", help="rank a few hundred strategies by exact DP")
+    parser.add_argument("--unit", type=float, default=1.0, help="DP bankroll granularity")
+    parser.add_argument("--cap", type=float, default=10000.0, help="DP balance cap (ends a session)")
+    parser.add_argument("--min-bet", type=float, default=1.0, help="smallest allowed bet")
+    parser.add_argument("--seed", type=int, help="RNG seed (random if omitted)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="host many players over TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="server bind address")
+    parser.add_argument("--db", default="casino.db", help="SQLite file for player balances")
+    parser.add_argument("--commit-interval", type=float, default=10.0,
+                        help="milliseconds of balance updates grouped into one commit")
+    parser.add_argument("--bench", choices=["sampler"], help="run a micro-benchmark and exit")
+    parser.add_argument("--check-sampler", action="store_true",
+                        help="chi-square test of the sector sampler; exits 1 on failure")
+    args = parser.parse_args()
+
+    if args.bench == "sampler":
+        bench_sampler()
+        return
+    if args.check_sampler:
+        sys.exit(0 if check_sampler() else 1)
+
+    if args.serve:
+        try:
+            asyncio.run(serve(args.host, args.serve, args.db, args.commit_interval / 1000))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.dp:
+        t0 = time.perf_counter()
+        print(cross_check(_strategy_from_args(args), args.bankroll, args.spins, args.sessions,
+                          args.min_bet, args.unit, args.cap, args.seed, args.workers))
+        print(f"({time.perf_counter() - t0:.2f}s)")
+        return
+    if args.sweep:
+        dp = BankrollDP(unit=args.unit, cap=args.cap, min_bet=args.min_bet)
+        t0 = time.perf_counter()
+        results = dp.sweep(default_sweep(args.bankroll, args.stop_loss, args.take_profit),
+                           args.bankroll, args.spins)
+        elapsed = time.perf_counter() - t0
+        print(f"{len(results)} strategies, bankroll {args.bankroll:g}, {args.spins} spins, "
+              f"cap {args.cap:g} ({elapsed:.2f}s)")
+        for title, order in (("highest expected final balance", lambda x: -x[1]["final"]),
+                             ("lowest ruin probability", lambda x: (x[1]["ruin"], -x[1]["final"]))):
+            print(f"\n{title}:")
+            for strategy, res in sorted(results, key=order)[:10]:
+                print(f"  {strategy!r:<48} ruin {res['ruin']:.4f}  cap {res['capped']:.4f}  "
+                      f"final ${res['final']:,.2f}")
+        return
+    if args.simulate:
+        t0 = time.perf_counter()
+        totals = simulate(args.sessions, args.spins, args.bankroll, _strategy_from_args(args),
+                          args.min_bet, args.seed, args.workers)
+        elapsed = time.perf_counter() - t0
+        print(simulation_report(totals, args.bankroll))
+        print(f"{totals['spins'] / elapsed:,.0f} spins/s ({elapsed:.2f}s)")
+        return
+
     print("Welcome to Lucky Spin Casino (demo).")
     balance = 100.0
     print("Starting balance: $100.00")
@@ -0,0 +1,79 @@
+"""
+Load generator for the casino.py multi-player server.
+Each connection logs in as its own player and spins repeatedly; reports spins/s,
+spin latency (which includes waiting for the balance commit) and server commit stats.
+Run: python casino.py --serve 8766  then  python casino_loadgen.py --port 8766 -c 1000 -n 20
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+async def request(reader, writer, line):
+    writer.write(line.encode("utf-8") + b"\n")
+    await writer.drain()
+    reply = []
+    # reply ends with an empty line
+    while (raw := await reader.readline()) not in (b"\n", b""):
+        reply.append(raw.decode("utf-8").rstrip("\n"))
+    return "\n".join(reply)
+
+async def connect(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    await request(reader, writer, "")  # consume the greeting (ends with an empty line)
+    return reader, writer
+
+async def player(host, port, name, n, bet, latencies, errors):
+    try:
+        reader, writer = await connect(host, port)
+    except OSError:
+        errors.append(1)
+        return
+    try:
+        await request(reader, writer, f"login {name}")
+        for _ in range(n):
+            t0 = time.perf_counter()
+            reply = await request(reader, writer, f"spin {bet}")
+            if not reply.startswith("Result"):
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - t0)
+        await request(reader, writer, "quit")
+    except ConnectionError:
+        errors.append(1)
+    finally:
+        writer.close()
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))
+    return sorted_values[i]
+
+async def run(host, port, connections, spins, bet):
+    latencies, errors = [], []
+    run_id = uuid.uuid4().hex[:8]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(player(host, port, f"load-{run_id}-{i}", spins, bet, latencies, errors)
+                           for i in range(connections)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    print(f"players: {connections}, spins: {len(latencies)}, errors: {len(errors)}")
+    print(f"elapsed: {elapsed:.2f}s, throughput: {len(latencies) / elapsed:,.0f} spins/s")
+    print(f"spin p50: {percentile(latencies, 50) * 1000:.2f} ms, p99: {percentile(latencies, 99) * 1000:.2f} ms")
+    reader, writer = await connect(host, port)
+    print("server", await request(reader, writer, "stats"))
+    writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the casino.py server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("-c", "--connections", type=int, default=100, help="concurrent players")
+    parser.add_argument("-n", "--spins", type=int, default=50, help="spins per player")
+    parser.add_argument("--bet", type=float, default=1.0, help="bet per spin")
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.connections, args.spins, args.bet))
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ import random
 import time
 import os
 
+import term_render
+from term_render import TerminalRenderer
+
 WORDS = ["python", "hangman", "dinosaur", "programming", "computer", "keyboard", "monitor", "algorithm"]
 
 HANGMAN_STAGES = [
@@ -73,11 +76,11 @@ HANGMAN_STAGES = [
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
+async def animate_text_async(text, delay=0.05, renderer=None):
+    await (renderer or TerminalRenderer()).typewriter(text, delay)
+
 def animate_text(text, delay=0.05):
-    for char in text:
-        print(char, end='', flush=True)
-        time.sleep(delay)
-    print()
+    term_render.run(animate_text_async(text, delay))
 
 def main():
     clear_screen()
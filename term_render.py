@@ -0,0 +1,186 @@
+"""
+Shared terminal renderer for the games: animations run on a fixed asyncio frame clock
+instead of sleeping, so many sessions can animate concurrently in one process.
+
+A frame is shown according to elapsed time, not frame count, so a loaded event loop
+drops frames rather than stretching the animation. Output that is not a TTY (pipes,
+files, logs) collapses each animation to its final frame.
+
+Demo / benchmark:  python term_render.py --sessions 1000
+"""
+import asyncio
+import sys
+import time
+import weakref
+
+DEFAULT_FPS = 30
+
+class FrameClock:
+    """
+    One timer per event loop and frame rate that every animation waits on, instead of a
+    sleep per animation. Ticks only while someone is waiting. When the loop falls behind,
+    missed ticks are skipped (and counted in `dropped`) rather than replayed.
+    """
+    def __init__(self, fps=DEFAULT_FPS):
+        self.period = 1.0 / fps
+        self.frame = 0
+        self.dropped = 0
+        self._future = None
+        self._task = None
+
+    async def tick(self) -> int:
+        """Wait for the next frame; returns the frame number."""
+        loop = asyncio.get_running_loop()
+        if self._future is None:
+            self._future = loop.create_future()
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+        # shield: one cancelled waiter must not cancel the frame for everyone else
+        return await asyncio.shield(self._future)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.period
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+                behind = int((loop.time() - deadline) / self.period)
+                self.dropped += behind
+                self.frame += 1 + behind
+                deadline += (1 + behind) * self.period
+                future, self._future = self._future, None
+                if future is None:  # nobody waited for this frame: go idle
+                    return
+                if not future.done():
+                    future.set_result(self.frame)
+        finally:
+            # also when cancelled at loop shutdown: a task or future left here would keep
+            # the loop (this clock's _CLOCKS key) alive, so its entry would never go away
+            self._task = self._future = None
+
+_CLOCKS = weakref.WeakKeyDictionary()
+
+def frame_clock(fps=DEFAULT_FPS) -> FrameClock:
+    """The shared clock for the running event loop at this frame rate."""
+    clocks = _CLOCKS.setdefault(asyncio.get_running_loop(), {})
+    if fps not in clocks:
+        clocks[fps] = FrameClock(fps)
+    return clocks[fps]
+
+class TerminalRenderer:
+    """
+    Draws animations for one session on `stream`: anything with write(), plus
+    optional flush() and an awaitable drain() (e.g. an asyncio StreamWriter, with
+    encoding set since it takes bytes). interactive defaults to stream.isatty().
+    """
+    def __init__(self, stream=None, fps=DEFAULT_FPS, interactive=None, encoding=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.encoding = encoding
+        self.fps = fps
+        if interactive is None:
+            isatty = getattr(self.stream, "isatty", None)
+            interactive = bool(isatty and isatty())
+        self.interactive = interactive
+        self.frames_drawn = 0
+
+    async def _write(self, text):
+        self.stream.write(text.encode(self.encoding) if self.encoding else text)
+        flush = getattr(self.stream, "flush", None)
+        if flush is not None:
+            flush()
+        drain = getattr(self.stream, "drain", None)
+        if drain is not None:
+            await drain()
+
+    async def play(self, frames, end="\n"):
+        """
+        Show frames in place on one line. Each frame is text or (text, seconds); bare
+        text is held for one clock period.
+        """
+        timeline, total = [], 0.0
+        period = 1.0 / self.fps
+        for frame in frames:
+            text, seconds = (frame, period) if isinstance(frame, str) else frame
+            total += seconds
+            timeline.append((total, text))
+        if not timeline:
+            return
+        if not self.interactive:
+            await self._write(timeline[-1][1] + end)
+            return
+        clock = frame_clock(self.fps)
+        start = time.monotonic()
+        shown, width, i = None, 0, 0
+        while True:
+            elapsed = time.monotonic() - start
+            while i < len(timeline) - 1 and timeline[i][0] <= elapsed:
+                i += 1
+            if i != shown:
+                text = timeline[i][1]
+                await self._write("\r" + text + " " * max(0, width - len(text)))
+                width, shown = len(text), i
+                self.frames_drawn += 1
+            if elapsed >= total:
+                break
+            await clock.tick()
+        await self._write(end)
+
+    async def typewriter(self, text, delay=0.05, end="\n"):
+        """Reveal text one character per `delay` seconds, several per frame if needed."""
+        if not self.interactive or delay <= 0 or not text:
+            await self._write(text + end)
+            return
+        clock = frame_clock(self.fps)
+        start = time.monotonic()
+        written = 0
+        while written < len(text):
+            upto = min(len(text), int((time.monotonic() - start) / delay) + 1)
+            if upto > written:
+                await self._write(text[written:upto])
+                written = upto
+                self.frames_drawn += 1
+            if written < len(text):
+                await clock.tick()
+        await self._write(end)
+
+def run(coro):
+    """Run a renderer coroutine from blocking code (the single-player games)."""
+    return asyncio.run(coro)
+
+class _NullTTY:
+    """Interactive sink for the benchmark: counts bytes instead of printing."""
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text)
+
+def bench(sessions=1000, seconds=1.0, fps=DEFAULT_FPS):
+    """Animate many sessions concurrently and compare wall time with sleeping per frame."""
+    spinner = "|/-\\"
+    frames = [(f"Spinning... {spinner[i % 4]}  [{i}]", 0.04) for i in range(int(seconds / 0.04))]
+
+    async def main():
+        renderers = [TerminalRenderer(_NullTTY(), fps, interactive=True) for _ in range(sessions)]
+        await asyncio.gather(*(r.play(frames) for r in renderers))
+        return renderers
+
+    t0 = time.perf_counter()
+    renderers = asyncio.run(main())
+    wall = time.perf_counter() - t0
+    drawn = sum(r.frames_drawn for r in renderers)
+    print(f"{sessions:,} concurrent sessions of a {seconds:g}s animation at {fps} fps")
+    print(f"wall {wall:.2f}s (sequential sleeping: {sessions * seconds:,.0f}s), "
+          f"{drawn:,} frames drawn, {drawn / wall:,.0f} frames/s")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Terminal renderer demo / benchmark")
+    parser.add_argument("--sessions", type=int, default=1000, help="concurrent animated sessions")
+    parser.add_argument("--seconds", type=float, default=1.0, help="animation length")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS, help="frame clock rate")
+    args = parser.parse_args()
+    bench(args.sessions, args.seconds, args.fps)
+
+if __name__ == "__main__":
+    main()